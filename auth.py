@@ -1,31 +1,80 @@
-import bcrypt
 from sqlalchemy import create_engine, text
 import streamlit as st
 import base64
 from db import get_engine
 import secrets
+import threading
+import time
 from datetime import datetime
 from typing import Optional
 
+from utils import passwords, reference
+
 db = st.secrets["database"]
 engine = get_engine()
 
+USER_CACHE_TTL = 60
+
+_users_by_email = {}
+_users_by_id = {}
+_users_lock = threading.Lock()
+
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return passwords.hash_password(password)
 
 def check_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    # Raises passwords.Busy when the bcrypt pool is saturated.
+    return passwords.check_password(password, hashed)
+
+def _normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+def _cached(cache, key) -> dict | None:
+    with _users_lock:
+        entry = cache.get(key)
+    if entry and time.monotonic() - entry[1] < USER_CACHE_TTL:
+        return dict(entry[0])
+    return None
+
+def _remember(user: dict) -> None:
+    entry = (dict(user), time.monotonic())
+    with _users_lock:
+        _users_by_id[user["id"]] = entry
+        if user.get("email"):
+            _users_by_email[_normalize_email(user["email"])] = entry
+
+def forget_users() -> None:
+    with _users_lock:
+        _users_by_email.clear()
+        _users_by_id.clear()
+
+def _load_user(sql: str, params: dict) -> dict | None:
+    with engine.connect() as conn:
+        result = conn.execute(text(sql), params).first()
+    if result is None:
+        return None
+    user = dict(result._mapping)
+    _remember(user)
+    return dict(user)
 
 def get_user_by_email(email: str) -> dict | None:
-    with engine.connect() as conn:
-        result = conn.execute(
-            text("SELECT * FROM technicians WHERE LOWER(email) = :email"),
-            {"email": email.lower()}
-        ).first()
+    # Misses are not cached, so a newly added technician can sign in at once.
+    email = _normalize_email(email)
+    return _cached(_users_by_email, email) or _load_user(
+        "SELECT * FROM technicians WHERE LOWER(email) = :email", {"email": email}
+    )
 
-        if result:
-            return dict(result._mapping)
-        return None
+def get_user_by_id(user_id: int) -> dict | None:
+    return _cached(_users_by_id, user_id) or _load_user(
+        "SELECT * FROM technicians WHERE id = :id", {"id": user_id}
+    )
+
+def _on_reference_invalidate(tables: set) -> None:
+    # Roster saves invalidate "technicians", here and in the other app processes.
+    if "technicians" in tables:
+        forget_users()
+
+reference.subscribe(_on_reference_invalidate)
 
 def register_user(name: str, email: str, password: str) -> bool:
     if get_user_by_email(email):
@@ -40,6 +89,7 @@ def register_user(name: str, email: str, password: str) -> bool:
             """),
             {"name": name, "email": email.lower(), "password": hashed_pw}
         )
+    reference.invalidate("technicians")
     return True
 
 def is_team_lead(user: dict) -> bool:
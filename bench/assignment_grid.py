@@ -0,0 +1,91 @@
+import argparse
+import statistics
+import time
+from collections import namedtuple
+
+import pandas as pd
+
+from content.teamlead_view import LATEST_TASK_COLUMNS, build_assignments
+
+Row = namedtuple("Row", ["id", "name"])
+RackRow = namedtuple("RackRow", ["id", "name", "dh"])
+Tech = namedtuple("Tech", ["id", "name", "team_lead_name"])
+
+
+def dataset(technicians, racks):
+    locations = [Row(i, f"Location {i}") for i in range(1, 11)]
+    activities = [Row(i, f"Activity {i}") for i in range(1, 9)]
+    cable_types = [Row(i, f"Cable {i}") for i in range(1, 7)]
+    rack_rows = [RackRow(i, f"R{i:05}", f"DH{i % 5}") for i in range(1, racks + 1)]
+    techs = [Tech(i, f"Tech {i:04}", "Lead") for i in range(1, technicians + 1)]
+    latest = {
+        t.id: {
+            "technician_id": t.id, "location_id": 1 + t.id % 10, "activity_id": 1 + t.id % 8,
+            "cable_type_id": 1 + t.id % 6, "rack_id": racks - t.id % racks, "position": "left",
+            "timestamp": "2025-01-01 08:00:00", "created_by": "Lead",
+        }
+        for t in techs if t.id % 4
+    }
+    return locations, activities, cable_types, rack_rows, techs, latest
+
+
+def legacy_grid(locations, activities, cable_types, racks, technicians, latest_tasks):
+    # The comprehension the Team Lead panel used before build_assignments().
+    loc_options = {loc.name: loc.id for loc in locations}
+    act_options = {act.name: act.id for act in activities}
+    cable_options = {ct.name: ct.id for ct in cable_types}
+    cable_id_to_name = {ct.id: ct.name for ct in cable_types}
+    tech_id_to_teamlead = {tech.id: tech.team_lead_name for tech in technicians}
+    return pd.DataFrame([{
+        "#": i + 1,
+        "Technician": tech.name,
+        "Location": next((loc.name for loc in locations if loc.id == latest_tasks.get(tech.id, {}).get("location_id")), list(loc_options.keys())[0]),
+        "Activity": next((act.name for act in activities if act.id == latest_tasks.get(tech.id, {}).get("activity_id")), list(act_options.keys())[0]),
+        "Cable Type": cable_id_to_name.get(latest_tasks.get(tech.id, {}).get("cable_type_id"), list(cable_options.keys())[0]),
+        "Rack": next((f"{rack.name} ({rack.dh})" for rack in racks if rack.id == latest_tasks.get(tech.id, {}).get("rack_id")), "-"),
+        "Position": latest_tasks.get(tech.id, {}).get("position", "Varies"),
+        "Team lead": tech_id_to_teamlead.get(tech.id, "-"),
+        "Created by": latest_tasks.get(tech.id, {}).get("created_by", "-"),
+        "Quantity": latest_tasks.get(tech.id, {}).get("quantity", 0),
+        "Time": latest_tasks.get(tech.id, {}).get("timestamp", "")
+    } for i, tech in enumerate(technicians)])
+
+
+def vectorized_grid(locations, activities, cable_types, racks, technicians, latest_tasks):
+    return build_assignments(
+        pd.DataFrame(technicians, columns=["id", "name", "team_lead_name"]),
+        pd.DataFrame(list(latest_tasks.values()), columns=LATEST_TASK_COLUMNS),
+        {row.id: row.name for row in locations},
+        {row.id: row.name for row in activities},
+        {row.id: row.name for row in cable_types},
+        {row.id: f"{row.name} ({row.dh})" for row in racks},
+    )
+
+
+def median_ms(fn, args, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Team Lead assignments grid build time.")
+    parser.add_argument("--technicians", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--racks", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'technicians':>11} {'racks':>7} {'legacy ms':>10} {'vectorized ms':>14}")
+    for technicians in args.technicians:
+        for racks in args.racks:
+            data = dataset(technicians, racks)
+            legacy = median_ms(legacy_grid, data, args.repeat)
+            vectorized = median_ms(vectorized_grid, data, args.repeat)
+            print(f"{technicians:>11} {racks:>7} {legacy:>10.1f} {vectorized:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import argparse
+import statistics
+import time
+from datetime import date
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import text
+
+from bench.seed import apply_migrations, get_bench_engine, seed, seeded_counts
+from utils import rack_state
+from utils.dates import DEFAULT_TIMEZONE, day_bounds
+from utils.report_sql import DAILY_RACK_REPORT_SQL, DATAHALL_REPORT_SQL
+
+# The report queries as they were before the technician rollup CTEs, for comparison.
+OLD_DATAHALL_REPORT_SQL = """
+    SELECT r.name AS rack_name, r.dh, r.su, r.lu, r.row, rs.position,
+           a.name AS activity, ct.name AS cable_type, s.name AS status,
+           rs.quantity, rs.percent, t.name AS created_by, rs.created_at,
+           (
+               SELECT STRING_AGG(DISTINCT tt_tech.name, ', ')
+               FROM technician_tasks tt
+               JOIN technicians tt_tech ON tt.technician_id = tt_tech.id
+               WHERE tt.rack_id = r.id
+                 AND tt.activity_id = rs.activity_id
+                 AND tt.cable_type_id = rs.cable_type_id
+           ) AS technicians
+    FROM racks r
+    LEFT JOIN rack_state_current rs ON rs.rack_id = r.id
+    LEFT JOIN activities a ON rs.activity_id = a.id
+    LEFT JOIN cable_type ct ON rs.cable_type_id = ct.id
+    LEFT JOIN statuses s ON rs.status_id = s.id
+    LEFT JOIN technicians t ON rs.created_by = t.id
+    WHERE r.dh = :selected_dh
+    ORDER BY r.name, rs.created_at DESC NULLS LAST
+"""
+
+OLD_DAILY_RACK_REPORT_SQL = """
+    SELECT DISTINCT ON (rs.rack_id, rs.activity_id, rs.cable_type_id, rs.position, rs.status_id)
+        r.name AS rack_name, r.dh, r.su, rs.position, a.name AS activity, ct.name AS cable_type,
+        s.name AS status, rs.quantity, rs.percent,
+        (
+            SELECT STRING_AGG(DISTINCT t2.name, ', ')
+            FROM technician_tasks tt2
+            JOIN technicians t2 ON t2.id = tt2.technician_id
+            WHERE tt2.rack_id = rs.rack_id
+              AND tt2.activity_id = rs.activity_id
+              AND tt2.cable_type_id = rs.cable_type_id
+              AND tt2.timestamp >= :start_datetime AND tt2.timestamp < :end_datetime
+        ) AS technicians,
+        u.name AS created_by, rs.created_at AS created_at
+    FROM rack_states rs
+    JOIN racks r ON r.id = rs.rack_id
+    LEFT JOIN activities a ON a.id = rs.activity_id
+    LEFT JOIN cable_type ct ON ct.id = rs.cable_type_id
+    LEFT JOIN statuses s ON s.id = rs.status_id
+    LEFT JOIN technicians u ON u.id = rs.created_by
+    WHERE rs.created_at >= :start_datetime AND rs.created_at < :end_datetime
+    ORDER BY rs.rack_id, rs.activity_id, rs.cable_type_id, rs.position, rs.status_id, rs.created_at DESC
+"""
+
+
+def time_query(conn, sql, params, repeat):
+    timings = []
+    rows = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = len(conn.execute(text(sql), params).fetchall())
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), max(timings), rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency of the Datahall and daily rack reports.")
+    parser.add_argument("--date", type=date.fromisoformat, default=date.today())
+    parser.add_argument("--budget-ms", type=float, default=1000.0, help="fail if a new report's median exceeds this")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-old", action="store_true", help="do not time the correlated-subquery versions")
+    args = parser.parse_args()
+
+    engine = get_bench_engine()
+    seed(engine, racks_per_dh=5000, tasks=1_000_000)
+    apply_migrations(engine)
+    with engine.begin() as conn:
+        rack_state.backfill(conn)
+        conn.exec_driver_sql("ANALYZE")
+        selected_dh = conn.execute(text("SELECT MIN(dh) FROM racks")).scalar()
+        rack_ids = conn.execute(text("SELECT id FROM racks WHERE dh = :dh"), {"dh": selected_dh}).scalars().all()
+        dh_racks = len(rack_ids)
+
+    counts = seeded_counts(engine)
+    print(f"Dataset: {counts}, {dh_racks} racks in {selected_dh}")
+    if dh_racks < 5000 or counts["tasks"] < 1_000_000:
+        print("Warning: dataset is smaller than 5,000 racks per DH / 1M tasks; reseed with --reset.")
+
+    start, end = day_bounds(args.date, ZoneInfo(DEFAULT_TIMEZONE))
+    cases = [
+        ("datahall report", DATAHALL_REPORT_SQL, OLD_DATAHALL_REPORT_SQL,
+         {"selected_dh": selected_dh, "rack_ids": rack_ids}),
+        ("daily rack report", DAILY_RACK_REPORT_SQL.format(filters=""), OLD_DAILY_RACK_REPORT_SQL,
+         {"start_datetime": start, "end_datetime": end}),
+    ]
+
+    failed = False
+    with engine.connect() as conn:
+        for name, new_sql, old_sql, params in cases:
+            median, worst, rows = time_query(conn, new_sql, params, args.repeat)
+            status = "ok" if median <= args.budget_ms else "OVER BUDGET"
+            failed = failed or median > args.budget_ms
+            print(f"{name:18} rollup      median {median:9.1f} ms  max {worst:9.1f} ms  rows {rows:7}  {status}")
+            if not args.skip_old:
+                median, worst, rows = time_query(conn, old_sql, params, 1)
+                print(f"{name:18} correlated  median {median:9.1f} ms  max {worst:9.1f} ms  rows {rows:7}")
+
+    if failed:
+        raise SystemExit(f"Report latency above {args.budget_ms} ms")
+
+
+if __name__ == "__main__":
+    main()
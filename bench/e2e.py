@@ -0,0 +1,233 @@
+import argparse
+import json
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from streamlit import config
+from streamlit.testing.v1 import AppTest
+
+from bench.seed import apply_migrations, get_bench_engine, seed, seeded_counts
+from utils import current_task, pdf_report, rack_state, write_queue
+from utils.dates import DEFAULT_TIMEZONE, day_bounds
+
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+PERCENTILES = [50, 95, 99]
+
+
+def page_script(page, user):
+    # Runs inside AppTest: one page, as streamlit_app dispatches it after sign-in.
+    import streamlit as st
+    from content import reports, settings, sources, survey, teamlead_view
+
+    if user is not None:
+        st.session_state.user = user
+    {
+        "Survey": survey.run,
+        "Team Lead": teamlead_view.run,
+        "Reports": reports.run,
+        "Sources": sources.run,
+        "Settings": settings.run,
+    }[page]()
+
+
+def app_secrets(url, workdir):
+    url = make_url(url)
+    return {
+        "database": {
+            "user": url.username or "", "password": url.password or "", "host": url.host or "localhost",
+            "port": url.port or 5432, "dbname": url.database,
+        },
+        "reports": {"cache_dir": str(workdir / "report_cache")},
+        "write_queue": {"spool_path": str(workdir / "write_queue.sqlite3")},
+    }
+
+
+def use_secrets_file(secrets, workdir):
+    # AppTest secrets only apply inside at.run(); app code called directly
+    # (write_queue, _save_assignments) reads the global st.secrets.
+    lines = []
+    for section, values in secrets.items():
+        lines.append(f"[{section}]")
+        lines += [f"{key} = {json.dumps(value)}" for key, value in values.items()]
+    path = workdir / "secrets.toml"
+    path.write_text("\n".join(lines) + "\n")
+    config.set_option("secrets.files", [str(path)])
+
+
+def new_app(page, user, secrets, email=None):
+    at = AppTest.from_function(page_script, args=(page, user), default_timeout=120)
+    for name, values in secrets.items():
+        at.secrets[name] = values
+    if email:
+        at.query_params["email"] = email
+    return at
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - started) * 1000, result
+
+
+def check(at, action):
+    if at.exception:
+        raise SystemExit(f"{action}: {at.exception[0].message}")
+
+
+def button(at, label):
+    return next(b for b in at.button if b.label == label)
+
+
+def measure(samples, action, repeat, fn):
+    for _ in range(repeat):
+        ms, _ = timed(fn)
+        samples.setdefault(action, []).append(ms)
+
+
+def run_suite(engine, secrets, repeat):
+    with engine.connect() as conn:
+        lead = dict(conn.execute(text(
+            "SELECT * FROM technicians WHERE is_teamlead AND admin ORDER BY id LIMIT 1"
+        )).first()._mapping)
+        technician = dict(conn.execute(text(
+            "SELECT * FROM technicians WHERE team_lead = :id ORDER BY id LIMIT 1"
+        ), {"id": lead["id"]}).first()._mapping)
+
+    samples = {}
+
+    def page_load(page, user=None, email=None):
+        at = new_app(page, user, secrets, email)
+        at.run()
+        check(at, page)
+        return at
+
+    # Warm the engine, reference caches and imports once before timing anything.
+    for page in ("Survey", "Team Lead", "Reports", "Sources", "Settings"):
+        page_load(page, lead)
+
+    for page in ("Team Lead", "Reports", "Sources", "Settings"):
+        measure(samples, f"{page} load", repeat, lambda: page_load(page, lead))
+    measure(samples, "Survey load (?email=)", repeat, lambda: page_load("Survey", email=technician["email"]))
+
+    def survey_confirm():
+        at = page_load("Survey", email=technician["email"])
+        ms, _ = timed(lambda: button(at, "Confirm").click().run())
+        check(at, "survey confirm")
+        samples.setdefault("survey confirm", []).append(ms)
+
+    for _ in range(repeat):
+        survey_confirm()
+    measure(samples, "survey queue flush", 1, lambda: write_queue.flush(100_000))
+
+    def team_lead_save():
+        at = page_load("Team Lead", lead)
+        ms, _ = timed(lambda: button(at, "📂 Save tasks").click().run())
+        check(at, "team lead save")
+        samples.setdefault("team lead save (form)", []).append(ms)
+
+    for _ in range(repeat):
+        team_lead_save()
+
+    def team_lead_save_rows():
+        from content.teamlead_view import _save_assignments
+        with engine.connect() as conn:
+            crew = conn.execute(text(
+                "SELECT id FROM technicians WHERE team_lead = :id ORDER BY id"
+            ), {"id": lead["id"]}).scalars().all()
+        changes = pd.DataFrame({
+            "tech_id": crew, "loc_id": 1, "act_id": 1, "cable_id": 1, "rack_id": 1,
+            "Position": "left", "Quantity": 1,
+        })
+        now = pd.Timestamp.now(tz="UTC")
+        with engine.begin() as conn:
+            tasks = _save_assignments(conn, changes, lead["id"], now)
+        write_queue.submit(tasks, now)
+        write_queue.flush(100_000)
+
+    measure(samples, "team lead save (whole crew)", repeat, team_lead_save_rows)
+
+    def pdf_click():
+        at = page_load("Reports", lead)
+        ms, _ = timed(lambda: button(at, "📄 Generate PDF report for today").click().run())
+        check(at, "pdf")
+        samples.setdefault("pdf button (cached after first)", []).append(ms)
+
+    for _ in range(repeat):
+        pdf_click()
+
+    start, end = day_bounds(date.today(), ZoneInfo(DEFAULT_TIMEZONE))
+
+    def pdf_render():
+        with engine.connect() as conn:
+            pdf_report.daily_report(conn, start, end, date.today())
+
+    measure(samples, "pdf render (uncached)", repeat, pdf_render)
+    return samples
+
+
+def summarize(samples):
+    return {
+        action: {f"p{p}": round(float(np.percentile(values, p)), 1) for p in PERCENTILES} | {"n": len(values)}
+        for action, values in samples.items()
+    }
+
+
+def report(results, baseline, tolerance):
+    regressions = []
+    print(f"{'action':34} {'n':>4} " + " ".join(f"{f'p{p} ms':>10}" for p in PERCENTILES) + f" {'p95 vs base':>12}")
+    for action, stats in results.items():
+        line = f"{action:34} {stats['n']:>4} " + " ".join(f"{stats[f'p{p}']:>10.1f}" for p in PERCENTILES)
+        base = (baseline or {}).get(action)
+        if base and base.get("p95"):
+            change = (stats["p95"] - base["p95"]) / base["p95"]
+            line += f" {change:>+11.0%}"
+            if change > tolerance:
+                regressions.append(action)
+                line += "  REGRESSION"
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end page and action latency through Streamlit AppTest.")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 slowdown against the baseline")
+    args = parser.parse_args()
+
+    engine = get_bench_engine()
+    seed(engine)
+    apply_migrations(engine)
+    with engine.begin() as conn:
+        if not conn.execute(text("SELECT EXISTS (SELECT 1 FROM rack_state_current)")).scalar():
+            rack_state.backfill(conn)
+        if not conn.execute(text("SELECT EXISTS (SELECT 1 FROM technician_current_task)")).scalar():
+            start, end = day_bounds(date.today(), ZoneInfo(DEFAULT_TIMEZONE))
+            current_task.rebuild(conn, start, end)
+    print(f"Dataset: {seeded_counts(engine)}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        secrets = app_secrets(str(engine.url.render_as_string(hide_password=False)), Path(workdir))
+        use_secrets_file(secrets, Path(workdir))
+        results = summarize(run_suite(engine, secrets, args.repeat))
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else None
+    regressions = report(results, baseline, args.tolerance)
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Baseline saved to {args.baseline}")
+    elif regressions:
+        raise SystemExit(f"p95 regressed more than {args.tolerance:.0%}: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+from utils.passwords import PasswordPool
+
+
+def run_logins(check, hashed, logins, sessions):
+    # sessions threads stand in for Streamlit session threads submitting at once.
+    started = time.perf_counter()
+    with ThreadPoolExecutor(sessions) as sessions_pool:
+        results = list(sessions_pool.map(lambda _: check("secret-password", hashed), range(logins)))
+    elapsed = time.perf_counter() - started
+    assert all(results)
+    return logins / elapsed
+
+
+def inline_check(password, hashed):
+    return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="bcrypt logins per second, inline versus the worker pool.")
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 12])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--sessions", type=int, default=32)
+    parser.add_argument("--logins", type=int, default=64)
+    args = parser.parse_args()
+
+    print(f"{args.sessions} concurrent sessions, {args.logins} logins, {args.workers} workers")
+    print(f"{'rounds':>6} {'mode':>8} {'logins/s':>10} {'per core':>10}")
+    for rounds in args.rounds:
+        hashed = bcrypt.hashpw(b"secret-password", bcrypt.gensalt(rounds)).decode("utf-8")
+
+        # bcrypt releases the GIL, so inline checks spread over every core.
+        rate = run_logins(inline_check, hashed, args.logins, args.sessions)
+        print(f"{rounds:>6} {'inline':>8} {rate:>10.1f} {rate / (os.cpu_count() or 1):>10.1f}")
+
+        pool = PasswordPool(args.workers, max_pending=args.workers * 4, rounds=rounds, wait_seconds=600)
+        try:
+            pool.check("secret-password", hashed)  # start the workers
+            rate = run_logins(pool.check, hashed, args.logins, args.sessions)
+        finally:
+            pool.shutdown()
+        print(f"{rounds:>6} {'pool':>8} {rate:>10.1f} {rate / min(args.workers, os.cpu_count() or 1):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import os
+import statistics
+import time
+from collections import namedtuple
+from datetime import date
+from zoneinfo import ZoneInfo
+
+from utils import pdf_report
+from utils.dates import DEFAULT_TIMEZONE, day_bounds
+
+SummaryRow = namedtuple("SummaryRow", ["dh", "status", "activity", "cable_type", "rack_count"])
+
+STATUSES = ["blocked", "done", "in progress"]
+
+
+def synthetic_rows(datahalls, activities=8, cable_types=6):
+    return [
+        SummaryRow(f"DH{dh:02}", status, f"Activity {a}", f"Cable {c}", (dh * a * c) % 97 + 1)
+        for dh in range(1, datahalls + 1)
+        for status in STATUSES
+        for a in range(1, activities + 1)
+        for c in range(1, cable_types + 1)
+    ]
+
+
+def timed(fn, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), max(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Daily PDF report generation time.")
+    parser.add_argument("--datahalls", type=int, default=50)
+    parser.add_argument("--date", type=date.fromisoformat, default=date.today())
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.datahalls)
+    median, worst, pdf = timed(lambda: pdf_report.render_daily_report(rows, args.date), args.repeat)
+    print(f"render {args.datahalls} DHs, {len(rows)} rollup rows: median {median:.1f} ms, "
+          f"max {worst:.1f} ms, {len(pdf) / 1024:.0f} KiB")
+
+    if not os.environ.get("BENCH_DATABASE_URL"):
+        print("BENCH_DATABASE_URL not set, skipping the database part.")
+        return
+
+    from bench.seed import get_bench_engine, seed
+
+    engine = get_bench_engine()
+    seed(engine, datahalls=args.datahalls)
+    start, end = day_bounds(args.date, ZoneInfo(DEFAULT_TIMEZONE))
+    with engine.connect() as conn:
+        median, worst, db_rows = timed(lambda: pdf_report.fetch_daily_summary(conn, start, end), args.repeat)
+        dhs = len({row.dh for row in db_rows})
+        print(f"summary query, {dhs} DHs with data: median {median:.1f} ms, max {worst:.1f} ms")
+        median, worst, pdf = timed(lambda: pdf_report.daily_report(conn, start, end, args.date), args.repeat)
+        print(f"query + render: median {median:.1f} ms, max {worst:.1f} ms, {len(pdf) / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
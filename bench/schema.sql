@@ -0,0 +1,76 @@
+-- Schema used by the benchmarks. It mirrors the tables the app reads and writes.
+-- Only load it into a scratch database.
+
+CREATE TABLE IF NOT EXISTS projects (
+    project TEXT PRIMARY KEY,
+    time_zone TEXT,
+    customer TEXT
+);
+
+CREATE TABLE IF NOT EXISTS technicians (
+    id SERIAL PRIMARY KEY,
+    name TEXT,
+    email TEXT,
+    password TEXT,
+    team_lead INTEGER,
+    project TEXT,
+    is_teamlead BOOLEAN DEFAULT false,
+    activ BOOLEAN DEFAULT true,
+    admin BOOLEAN DEFAULT false
+);
+
+CREATE TABLE IF NOT EXISTS locations (id SERIAL PRIMARY KEY, name TEXT);
+CREATE TABLE IF NOT EXISTS activities (id SERIAL PRIMARY KEY, name TEXT);
+CREATE TABLE IF NOT EXISTS cable_type (id SERIAL PRIMARY KEY, name TEXT);
+CREATE TABLE IF NOT EXISTS statuses (id SERIAL PRIMARY KEY, name TEXT);
+
+CREATE TABLE IF NOT EXISTS racks (
+    id SERIAL PRIMARY KEY,
+    name TEXT,
+    dh TEXT,
+    su TEXT,
+    lu TEXT,
+    row TEXT
+);
+
+CREATE TABLE IF NOT EXISTS rack_results (
+    id SERIAL PRIMARY KEY,
+    rack_id INTEGER,
+    activity_id INTEGER,
+    position TEXT,
+    cable_type_id INTEGER,
+    quantity INTEGER,
+    measurement TEXT
+);
+
+CREATE TABLE IF NOT EXISTS technician_tasks (
+    id SERIAL PRIMARY KEY,
+    technician_id INTEGER,
+    location_id INTEGER,
+    activity_id INTEGER,
+    cable_type_id INTEGER,
+    rack_id INTEGER,
+    rack TEXT,
+    source INTEGER,
+    position TEXT,
+    timestamp TIMESTAMPTZ
+);
+
+CREATE TABLE IF NOT EXISTS rack_states (
+    id SERIAL PRIMARY KEY,
+    rack_id INTEGER,
+    activity_id INTEGER,
+    cable_type_id INTEGER,
+    status_id INTEGER,
+    position TEXT,
+    quantity INTEGER,
+    percent NUMERIC,
+    created_by INTEGER,
+    created_at TIMESTAMPTZ
+);
+
+CREATE TABLE IF NOT EXISTS auth_tokens (
+    token TEXT PRIMARY KEY,
+    user_id INTEGER,
+    expires_at TIMESTAMPTZ
+);
@@ -0,0 +1,177 @@
+import argparse
+import os
+import re
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+
+ROOT = Path(__file__).resolve().parent.parent
+SCHEMA = Path(__file__).resolve().parent / "schema.sql"
+MIGRATIONS = ROOT / "migrations"
+CONCURRENT_INDEX = re.compile(r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)", re.I)
+
+DEFAULTS = {
+    "technicians": 300,
+    "datahalls": 5,
+    "racks_per_dh": 2000,
+    "tasks": 2_000_000,
+    "states": 2_000_000,
+    "days": 90,
+}
+
+TABLES = [
+    "rack_state_current", "technician_current_task", "auth_tokens", "rack_states", "technician_tasks", "rack_results", "racks",
+    "statuses", "cable_type", "activities", "locations", "technicians", "projects",
+]
+
+
+def get_bench_engine():
+    url = os.environ.get("BENCH_DATABASE_URL")
+    if not url:
+        raise SystemExit("Set BENCH_DATABASE_URL to a scratch PostgreSQL database, "
+                         "e.g. postgresql+psycopg2://postgres@localhost/datahall_bench")
+    return create_engine(url)
+
+
+def run_sql_file(engine, path):
+    sql = "\n".join(line for line in Path(path).read_text().splitlines() if not line.strip().startswith("--"))
+    concurrently = "CONCURRENTLY" in sql
+    with engine.connect() as conn:
+        if concurrently:
+            conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        for statement in sql.split(";"):
+            if not statement.strip():
+                continue
+            # After utils.partitions migrate the history tables are partitioned, where
+            # CONCURRENTLY is refused even when the index already exists.
+            index = CONCURRENT_INDEX.search(statement)
+            if index and conn.execute(text("SELECT to_regclass(:name)"), {"name": index.group(1)}).scalar():
+                continue
+            conn.exec_driver_sql(statement)
+        if not concurrently:
+            conn.commit()
+
+
+def apply_migrations(engine, names=None):
+    for path in sorted(MIGRATIONS.glob("*.sql")):
+        if names is None or path.stem in names or path.name in names:
+            run_sql_file(engine, path)
+
+
+def drop_indexes(engine, names):
+    with engine.begin() as conn:
+        for name in names:
+            conn.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+
+
+def seeded_counts(engine):
+    with engine.connect() as conn:
+        exists = conn.execute(text("SELECT to_regclass('technician_tasks') IS NOT NULL")).scalar()
+        if not exists:
+            return None
+        return {
+            "technicians": conn.execute(text("SELECT COUNT(*) FROM technicians")).scalar(),
+            "racks": conn.execute(text("SELECT COUNT(*) FROM racks")).scalar(),
+            "tasks": conn.execute(text("SELECT COUNT(*) FROM technician_tasks")).scalar(),
+            "states": conn.execute(text("SELECT COUNT(*) FROM rack_states")).scalar(),
+        }
+
+
+def seed(engine, reset=False, **sizes):
+    sizes = {**DEFAULTS, **{k: v for k, v in sizes.items() if v is not None}}
+
+    if reset:
+        with engine.begin() as conn:
+            for table in TABLES:
+                conn.exec_driver_sql(f"DROP TABLE IF EXISTS {table} CASCADE")
+
+    run_sql_file(engine, SCHEMA)
+
+    counts = seeded_counts(engine)
+    if counts and counts["tasks"]:
+        print(f"Already seeded: {counts}")
+        return counts
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO projects (project, time_zone, customer)
+            VALUES ('bench', 'America/Chicago', 'bench')
+        """))
+        conn.execute(text("""
+            INSERT INTO locations (name) SELECT 'Location ' || i FROM generate_series(1, 10) i;
+            INSERT INTO activities (name) SELECT 'Activity ' || i FROM generate_series(1, 8) i;
+            INSERT INTO cable_type (name) SELECT 'Cable ' || i FROM generate_series(1, 6) i;
+            INSERT INTO statuses (name) VALUES ('in progress'), ('done'), ('blocked');
+        """))
+        conn.execute(text("""
+            INSERT INTO technicians (name, email, project, is_teamlead, activ, admin)
+            SELECT 'Tech ' || i, 'tech' || i || '@example.com', 'bench', i % 20 = 1, true, i = 1
+            FROM generate_series(1, :n) i
+        """), {"n": sizes["technicians"]})
+        conn.execute(text("""
+            UPDATE technicians SET team_lead = ((id - 1) / 20) * 20 + 1 WHERE NOT is_teamlead
+        """))
+        conn.execute(text("""
+            INSERT INTO racks (name, dh, su, lu, row)
+            SELECT 'R' || lpad(r::text, 5, '0'), 'DH' || d, 'SU' || (r % 10), 'LU' || (r % 40), 'ROW' || (r / 50)
+            FROM generate_series(1, :dhs) d, generate_series(1, :racks) r
+        """), {"dhs": sizes["datahalls"], "racks": sizes["racks_per_dh"]})
+        conn.execute(text("""
+            INSERT INTO rack_results (rack_id, activity_id, position, cable_type_id, quantity)
+            SELECT r.id, 1 + (r.id % 8), (ARRAY['left', 'right', 'varies', 'back', 'front'])[1 + r.id % 5],
+                   1 + (r.id % 6), 10 + r.id % 90
+            FROM racks r
+        """))
+        conn.execute(text("""
+            INSERT INTO technician_tasks (
+                technician_id, location_id, activity_id, cable_type_id, rack_id, source, position, timestamp
+            )
+            SELECT 1 + (i % :techs), 1 + (i % 10), 1 + (i % 8), 1 + (i % 6), 1 + (i % :rack_count),
+                   1 + (i % :techs), (ARRAY['left', 'right', 'varies', 'back', 'front'])[1 + i % 5],
+                   now() - make_interval(secs => (i::float / :n) * :days * 86400)
+            FROM generate_series(1, :n) i
+        """), {
+            "n": sizes["tasks"],
+            "techs": sizes["technicians"],
+            "rack_count": sizes["datahalls"] * sizes["racks_per_dh"],
+            "days": sizes["days"],
+        })
+        conn.execute(text("""
+            INSERT INTO rack_states (
+                rack_id, activity_id, cable_type_id, status_id, position, quantity, percent, created_by, created_at
+            )
+            SELECT 1 + (i % :rack_count), 1 + (i % 8), 1 + (i % 6), 1 + (i % 3),
+                   (ARRAY['left', 'right', 'varies', 'back', 'front'])[1 + i % 5],
+                   i % 50, (i % 100)::numeric, 1 + (i % :techs),
+                   now() - make_interval(secs => (i::float / :n) * :days * 86400)
+            FROM generate_series(1, :n) i
+        """), {
+            "n": sizes["states"],
+            "techs": sizes["technicians"],
+            "rack_count": sizes["datahalls"] * sizes["racks_per_dh"],
+            "days": sizes["days"],
+        })
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("VACUUM ANALYZE")
+
+    counts = seeded_counts(engine)
+    print(f"Seeded {counts} in {time.perf_counter() - started:.1f}s")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a scratch database for the benchmarks.")
+    parser.add_argument("--reset", action="store_true", help="drop and recreate all tables first")
+    for name, default in DEFAULTS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=None, help=f"default {default}")
+    args = parser.parse_args()
+
+    sizes = {name: getattr(args, name) for name in DEFAULTS}
+    seed(get_bench_engine(), reset=args.reset, **sizes)
+
+
+if __name__ == "__main__":
+    main()
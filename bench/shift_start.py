@@ -0,0 +1,221 @@
+import argparse
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from streamlit import config
+
+from bench.seed import apply_migrations, get_bench_engine, seed
+
+STEPS = ["email lookup", "last task", "reference lists", "confirm", "session"]
+PERCENTILES = [50, 95, 99]
+
+LOCK_WAITS_SQL = """
+    SELECT COUNT(*) FILTER (WHERE wait_event_type = 'Lock') AS lock_waits,
+           COUNT(*) FILTER (WHERE state = 'active') AS active
+    FROM pg_stat_activity
+    WHERE datname = current_database() AND pid <> pg_backend_pid()
+"""
+
+
+def use_app_secrets(url, workdir, pool_size, max_overflow, pool_timeout):
+    # The app reads st.secrets; point it at a generated file for the scratch database.
+    url = make_url(url)
+    path = Path(workdir) / "secrets.toml"
+    path.write_text(f"""
+[database]
+user = "{url.username or ''}"
+password = "{url.password or ''}"
+host = "{url.host or 'localhost'}"
+port = {url.port or 5432}
+dbname = "{url.database}"
+pool_size = {pool_size}
+max_overflow = {max_overflow}
+pool_timeout = {pool_timeout}
+
+[write_queue]
+spool_path = "{Path(workdir) / 'write_queue.sqlite3'}"
+""")
+    config.set_option("secrets.files", [str(path)])
+
+
+class Monitor(threading.Thread):
+    # Samples the app pool and pg_stat_activity while the sessions run.
+    def __init__(self, engine, interval=0.1):
+        super().__init__(daemon=True)
+        self.engine = engine
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.pool = []
+        self.locks = []
+
+    def run(self):
+        import db
+        with self.engine.connect() as conn:
+            while not self.stopped.is_set():
+                status = db.pool_status()
+                if status:
+                    self.pool.append(status)
+                row = conn.execute(text(LOCK_WAITS_SQL)).first()
+                self.locks.append((row.lock_waits, row.active))
+                conn.commit()
+                self.stopped.wait(self.interval)
+
+
+def session(email, choices, mode, think, timings, errors):
+    # One technician opening ?email=... and pressing Confirm, as content/survey.py does it.
+    # App modules read st.secrets on import, so they are imported after use_app_secrets().
+    import db
+    from auth import get_user_by_email
+    from content.survey import last_task
+    from utils import current_task, reference, write_queue
+
+    steps = {}
+    started = time.perf_counter()
+    try:
+        mark = time.perf_counter()
+        user = get_user_by_email(email)
+        steps["email lookup"] = time.perf_counter() - mark
+        if not user:
+            raise LookupError(f"no technician {email}")
+
+        mark = time.perf_counter()
+        last_task(user)
+        steps["last task"] = time.perf_counter() - mark
+
+        mark = time.perf_counter()
+        locations = reference.locations().name_to_id
+        activities = reference.activities().name_to_id
+        cable_types = reference.cable_types().name_to_id
+        racks = reference.racks().name_to_id
+        steps["reference lists"] = time.perf_counter() - mark
+
+        pause = random.uniform(0, think)
+        time.sleep(pause)
+
+        tasks = pd.DataFrame([{
+            "technician_id": user["id"],
+            "location_id": locations[random.choice(choices["locations"])],
+            "activity_id": activities[random.choice(choices["activities"])],
+            "cable_type_id": cable_types[random.choice(choices["cable_types"])],
+            "rack_id": racks[random.choice(choices["racks"])],
+            "source": user["id"],
+        }])
+        mark = time.perf_counter()
+        now = datetime.now(timezone.utc)
+        if mode == "queue":
+            write_queue.submit(tasks, now)
+        else:
+            with db.get_engine().begin() as conn:
+                current_task.insert_tasks(conn, tasks, now)
+        steps["confirm"] = time.perf_counter() - mark
+        steps["session"] = time.perf_counter() - started - pause
+    except Exception as e:
+        errors.append(f"{email}: {e}")
+        return
+    for step, seconds in steps.items():
+        timings.setdefault(step, []).append(seconds * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shift start: N technicians submit the survey within a window.")
+    parser.add_argument("--sessions", type=int, default=300)
+    parser.add_argument("--window", type=float, default=60.0, help="seconds over which sessions arrive")
+    parser.add_argument("--think", type=float, default=2.0, help="max seconds between opening and Confirm")
+    parser.add_argument("--write", choices=["queue", "direct"], default="queue",
+                        help="write-behind queue (current app) or a synchronous insert per Confirm")
+    parser.add_argument("--pool-size", type=int, default=5)
+    parser.add_argument("--max-overflow", type=int, default=10)
+    parser.add_argument("--pool-timeout", type=int, default=30)
+    args = parser.parse_args()
+
+    engine = get_bench_engine()
+    seed(engine)
+    apply_migrations(engine)
+
+    with engine.connect() as conn:
+        emails = conn.execute(text("SELECT email FROM technicians WHERE activ ORDER BY id LIMIT :n"),
+                              {"n": args.sessions}).scalars().all()
+    if len(emails) < args.sessions:
+        print(f"Only {len(emails)} technicians seeded; sessions reuse emails.")
+        emails = [emails[i % len(emails)] for i in range(args.sessions)]
+
+    workdir = tempfile.mkdtemp(prefix="shift_start_")
+    use_app_secrets(engine.url.render_as_string(hide_password=False), workdir,
+                    args.pool_size, args.max_overflow, args.pool_timeout)
+
+    import db
+    from utils import reference, write_queue
+
+    choices = {
+        "locations": reference.locations().names,
+        "activities": reference.activities().names,
+        "cable_types": reference.cable_types().names,
+        "racks": reference.racks().names,
+    }
+    # Start from cold reference caches, as right after a deploy.
+    reference.invalidate()
+    if args.write == "queue":
+        write_queue.start_worker()
+
+    timings, errors = {}, []
+    monitor = Monitor(engine)
+    monitor.start()
+
+    started = time.perf_counter()
+    threads = []
+    offsets = sorted(random.uniform(0, args.window) for _ in emails)
+    for email, offset in zip(emails, offsets):
+        delay = offset - (time.perf_counter() - started)
+        if delay > 0:
+            time.sleep(delay)
+        thread = threading.Thread(target=session, args=(email, choices, args.write, args.think, timings, errors))
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    submitted = time.perf_counter() - started
+
+    while args.write == "queue" and write_queue.pending():
+        time.sleep(0.05)
+    drained = time.perf_counter() - started
+    monitor.stopped.set()
+    monitor.join()
+
+    done = len(timings.get("session", []))
+    print(f"{args.sessions} sessions over {args.window:.0f}s, write={args.write}, "
+          f"pool {args.pool_size}+{args.max_overflow}")
+    print(f"completed {done}, errors {len(errors)}, throughput {done / submitted:.1f} submissions/s")
+    if args.write == "queue":
+        print(f"all rows in PostgreSQL after {drained:.1f}s")
+
+    print(f"\n{'step':16} " + " ".join(f"{f'p{p} ms':>10}" for p in PERCENTILES) + f" {'max ms':>10}")
+    for step in STEPS:
+        values = timings.get(step)
+        if values:
+            print(f"{step:16} " + " ".join(f"{np.percentile(values, p):>10.1f}" for p in PERCENTILES)
+                  + f" {max(values):>10.1f}")
+
+    status = db.pool_status() or {}
+    peak = max((s["checked_out"] for s in monitor.pool), default=0)
+    print(f"\npool: peak checked out {peak} of {args.pool_size + args.max_overflow}, "
+          f"peak overflow {max((s['overflow'] for s in monitor.pool), default=0)}, "
+          f"checkout wait avg {status.get('wait_avg_ms', 0)} ms / max {status.get('wait_max_ms', 0)} ms, "
+          f"timeouts {status.get('timeouts', 0)}")
+    if monitor.locks:
+        print(f"lock waits: peak {max(l for l, _ in monitor.locks)} backends, "
+              f"{sum(1 for l, _ in monitor.locks if l) / len(monitor.locks):.0%} of samples; "
+              f"peak active backends {max(a for _, a in monitor.locks)}")
+    for error in errors[:10]:
+        print(f"error: {error}")
+
+
+if __name__ == "__main__":
+    main()
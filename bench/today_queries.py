@@ -0,0 +1,95 @@
+import argparse
+import json
+from datetime import date
+
+from sqlalchemy import text
+
+from bench.seed import apply_migrations, drop_indexes, get_bench_engine, seed
+from utils.dates import day_bounds, DEFAULT_TIMEZONE
+from zoneinfo import ZoneInfo
+
+INDEXES = [
+    "technician_tasks_technician_ts_idx",
+    "technician_tasks_ts_idx",
+    "rack_states_latest_idx",
+    "rack_states_created_at_idx",
+]
+
+# (name, old form with DATE(), new form with a half-open range)
+QUERIES = [
+    (
+        "survey last task",
+        """SELECT location_id, activity_id, cable_type_id, rack FROM technician_tasks
+           WHERE technician_id = 7 AND DATE(timestamp) = :today ORDER BY timestamp DESC LIMIT 1""",
+        """SELECT location_id, activity_id, cable_type_id, rack FROM technician_tasks
+           WHERE technician_id = 7 AND timestamp >= :start AND timestamp < :end ORDER BY timestamp DESC LIMIT 1""",
+    ),
+    (
+        "team lead latest tasks",
+        """SELECT * FROM (SELECT *, ROW_NUMBER() OVER (PARTITION BY technician_id ORDER BY timestamp DESC) rn
+           FROM technician_tasks WHERE technician_id = ANY(ARRAY[1,2,3,4,5,6,7,8,9,10]) AND DATE(timestamp) = :today) s
+           WHERE rn = 1""",
+        """SELECT * FROM (SELECT *, ROW_NUMBER() OVER (PARTITION BY technician_id ORDER BY timestamp DESC) rn
+           FROM technician_tasks WHERE technician_id = ANY(ARRAY[1,2,3,4,5,6,7,8,9,10])
+           AND timestamp >= :start AND timestamp < :end) s WHERE rn = 1""",
+    ),
+    (
+        "report tasks of day",
+        "SELECT COUNT(*) FROM technician_tasks WHERE DATE(timestamp) = :today",
+        "SELECT COUNT(*) FROM technician_tasks WHERE timestamp >= :start AND timestamp < :end",
+    ),
+    (
+        "report rack states of day",
+        "SELECT COUNT(*) FROM rack_states WHERE DATE(created_at) = :today",
+        "SELECT COUNT(*) FROM rack_states WHERE created_at >= :start AND created_at < :end",
+    ),
+]
+
+
+def explain(conn, sql, params):
+    plan = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}"), params).scalar()
+    plan = plan[0] if isinstance(plan, list) else json.loads(plan)[0]
+    nodes = []
+
+    def walk(node):
+        nodes.append(node["Node Type"] + (f" on {node['Index Name']}" if "Index Name" in node else ""))
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(plan["Plan"])
+    return plan["Execution Time"], nodes
+
+
+def run(engine, day):
+    tz = ZoneInfo(DEFAULT_TIMEZONE)
+    start, end = day_bounds(day, tz)
+    params = {"today": day, "start": start, "end": end}
+
+    results = []
+    for with_indexes in (False, True):
+        if with_indexes:
+            apply_migrations(engine, ["001_today_indexes"])
+        else:
+            drop_indexes(engine, INDEXES)
+        with engine.connect() as conn:
+            conn.exec_driver_sql("ANALYZE technician_tasks; ANALYZE rack_states")
+            for name, old_sql, new_sql in QUERIES:
+                for form, sql in (("DATE()", old_sql), ("range", new_sql)):
+                    ms, nodes = explain(conn, sql, params)
+                    results.append((name, "indexed" if with_indexes else "no index", form, ms, nodes))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare DATE() filters with timestamp ranges.")
+    parser.add_argument("--date", type=date.fromisoformat, default=date.today())
+    args = parser.parse_args()
+
+    engine = get_bench_engine()
+    seed(engine)
+    for name, indexes, form, ms, nodes in run(engine, args.date):
+        print(f"{name:28} {indexes:9} {form:7} {ms:9.2f} ms  {' > '.join(nodes)}")
+
+
+if __name__ == "__main__":
+    main()
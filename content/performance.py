@@ -0,0 +1,65 @@
+import pandas as pd
+import streamlit as st
+
+from db import pool_status
+from utils import query_stats, write_queue
+
+
+def _table(stats):
+    return pd.DataFrame([{
+        "id": s.id,
+        "calls": s.count,
+        "total ms": round(s.total_ms, 1),
+        "mean ms": round(s.mean_ms, 2),
+        "p95 ms ≤": s.percentile(0.95),
+        "max ms": round(s.max_ms, 1),
+        "rows": s.rows,
+        "pages": ", ".join(sorted(s.pages)),
+        "statement": s.sql,
+    } for s in stats])
+
+
+def run():
+    st.title("⏱️ Performance")
+    user = st.session_state.get("user")
+    if not user or not user.get("admin"):
+        st.error("Access denied")
+        return
+
+    top_n = st.number_input("Statements to show", min_value=5, max_value=200, value=20, step=5)
+    stats, recent = query_stats.snapshot()
+    st.caption(f"{len(stats)} distinct statements, {sum(s.count for s in stats)} calls since start or reset.")
+
+    if not stats:
+        st.info("No queries recorded yet.")
+    else:
+        st.subheader("🐢 Slowest (mean)")
+        st.dataframe(_table(query_stats.top("mean_ms", top_n)), use_container_width=True, hide_index=True)
+
+        st.subheader("⌛ Most time in total")
+        st.dataframe(_table(query_stats.top("total_ms", top_n)), use_container_width=True, hide_index=True)
+
+        st.subheader("🔁 Most frequent")
+        st.dataframe(_table(query_stats.top("count", top_n)), use_container_width=True, hide_index=True)
+
+        st.subheader("🕒 Recent")
+        st.dataframe(pd.DataFrame(recent[::-1][:500]), use_container_width=True, hide_index=True)
+
+    st.subheader("🔌 Connection pool")
+    st.json(pool_status() or {})
+
+    st.subheader("📮 Task write queue")
+    failed = write_queue.failed_count()
+    st.caption(f"{write_queue.pending()} rows waiting in the spool, {failed} rejected by the database.")
+    if failed:
+        st.warning("Rejected task submissions are kept in the spool's `failed` table; they were not saved.")
+        st.dataframe(write_queue.failed(), use_container_width=True, hide_index=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("⬇️ Prometheus metrics", query_stats.prometheus_text(),
+                           file_name="query_stats.prom", mime="text/plain")
+    with col2:
+        if st.button("🧹 Reset statistics"):
+            query_stats.reset()
+            st.rerun()
@@ -1,16 +1,11 @@
 import streamlit as st
 import pandas as pd
 from sqlalchemy import text
-from datetime import datetime, time, timedelta
 from db import get_engine
 from auth import is_admin
-from zoneinfo import ZoneInfo
-import pytz
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
-import tempfile
-import os
+from utils import current_task, dates, filters, profiler, rack_browser, reference, report_cache
+from utils.filters import FilterSpec
+from utils.report_sql import DAILY_RACK_REPORT_SQL, DATAHALL_REPORT_SQL
 
 def run():
     st.title("📊 Technician Tasks Report")
@@ -22,19 +17,34 @@ def run():
 
     engine = get_engine()
 
-    LOCAL_TIMEZONE = "America/Chicago"
-    now_local = datetime.now(ZoneInfo(LOCAL_TIMEZONE))
-    today_local = now_local.date()
+    project_tz = dates.project_timezone(user)
+    today_local = dates.today(project_tz)
 
     selected_date = st.date_input("Select date", value=today_local)
     show_latest_only = st.checkbox("Show current tasks only (1 per tech)", value=True)
 
-    start_datetime = datetime.combine(selected_date, time.min).replace(tzinfo=ZoneInfo(LOCAL_TIMEZONE))
-    end_datetime = start_datetime + timedelta(days=1)
+    start_datetime, end_datetime = dates.day_bounds(selected_date, project_tz)
+
+    if show_latest_only:
+        task_filters = FilterSpec({
+            "technician": "tech.id", "team_lead": "tl.id", "location": "loc.id", "activity": "act.id", "rack": "r.id",
+        })
+    else:
+        task_filters = FilterSpec({
+            "technician": "t.id", "team_lead": "tl.id", "location": "l.id", "activity": "a.id", "rack": "r.id",
+        })
+
+    with st.expander("🔍 Filters"):
+        filters.multiselect(task_filters, "technician", "Filter by technician", reference.technicians(), "filter_technician")
+        filters.multiselect(task_filters, "team_lead", "Filter by team_lead", reference.team_leads(), "filter_team_lead")
+        filters.multiselect(task_filters, "location", "Filter by location", reference.locations(), "filter_location")
+        filters.multiselect(task_filters, "activity", "Filter by activity", reference.activities(), "filter_activity")
+        filters.multiselect(task_filters, "rack", "Filter by rack", reference.racks(), "filter_rack")
+    profiler.lap("reference")
 
     with engine.connect() as conn:
         if show_latest_only:
-            query = """
+            query = f"""
                 SELECT 
                     tech.id AS technician_id,
                     tech.name AS technician,
@@ -48,25 +58,18 @@ def run():
                 FROM technicians tech
                 LEFT JOIN technicians tl ON tech.team_lead = tl.id
                 LEFT JOIN (
-                       SELECT *
-                    FROM (
-                        SELECT *,
-                               ROW_NUMBER() OVER (PARTITION BY technician_id ORDER BY timestamp DESC) AS rn
-                        FROM technician_tasks
-                        WHERE DATE(timestamp) = :selected_date
-                    ) sub
-                    WHERE rn = 1
+                    {current_task.latest_tasks_sql(start_datetime, end_datetime)}
                 ) task ON task.technician_id = tech.id
                 LEFT JOIN technicians src ON task.source = src.id
                 LEFT JOIN locations loc ON task.location_id = loc.id
                 LEFT JOIN activities act ON task.activity_id = act.id
                 LEFT JOIN cable_type ct ON task.cable_type_id = ct.id
                 LEFT JOIN racks r ON task.rack_id = r.id
-                WHERE tech.activ = true
+                WHERE tech.activ = true {task_filters.sql()}
                 ORDER BY tech.name
             """
         else:
-            query = """
+            query = f"""
                 SELECT 
                     t.name AS technician,
                     COALESCE(tl.name, '—') AS team_lead,
@@ -84,33 +87,30 @@ def run():
                 LEFT JOIN activities a ON task.activity_id = a.id
                 LEFT JOIN cable_type ct ON task.cable_type_id = ct.id
                 LEFT JOIN racks r ON task.rack_id = r.id
-                WHERE DATE(task.timestamp) = :selected_date
+                WHERE task.timestamp >= :start AND task.timestamp < :end {task_filters.sql()}
                 ORDER BY task.timestamp DESC
             """
 
         rows = conn.execute(text(query), {
-            "selected_date": selected_date
+            "start": start_datetime,
+            "end": end_datetime,
+            **task_filters.params()
         }).fetchall()
+    profiler.lap("query")
 
-    if not rows:
+    if not rows and not task_filters.selected:
         st.info("No tasks found for the selected date.")
         return
 
     df = pd.DataFrame([dict(row._mapping) for row in rows])
+    profiler.lap("build")
 
     # if "timestamp" in df.columns:
     #     df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True).dt.tz_convert(ZoneInfo(LOCAL_TIMEZONE))
 
-    with st.expander("🔍 Filters"):
-        for col in ["technician", "team_lead", "location", "activity", "rack"]:
-            if col in df.columns:
-                options = df[col].dropna().unique().tolist()
-                selected = st.multiselect(f"Filter by {col}", options, key=f"filter_{col}")
-                if selected:
-                    df = df[df[col].isin(selected)]
-
     st.dataframe(df, use_container_width=True)
     st.caption(f"Total records: {len(df)}")
+    profiler.lap("render")
 
 
     with engine.connect() as conn:
@@ -120,211 +120,45 @@ def run():
     selected_dh = st.selectbox("📍 Select Datahall (DH)", dh_options)
 
     if selected_dh:
-        with engine.connect() as conn:
-            result = conn.execute(text("""
-                SELECT 
-                    r.name AS rack_name,
-                    r.dh,
-                    r.su,
-                    r.lu,
-                    r.row,
-                    rs.position,
-                    a.name AS activity,
-                    ct.name AS cable_type,
-                    s.name AS status,
-                    rs.quantity,
-                    rs.percent,
-                    t.name AS created_by,
-                    rs.created_at,
-    
-                    (
-                        SELECT STRING_AGG(DISTINCT tt_tech.name, ', ')
-                        FROM technician_tasks tt
-                        JOIN technicians tt_tech ON tt.technician_id = tt_tech.id
-                        WHERE tt.rack_id = r.id
-                          AND tt.activity_id = rs.activity_id
-                          AND tt.cable_type_id = rs.cable_type_id
-                    ) AS technicians
-
-                FROM racks r
-                LEFT JOIN (
-                    SELECT *
-                    FROM (
-                        SELECT *,
-                               ROW_NUMBER() OVER (
-                                   PARTITION BY rack_id, position, activity_id, cable_type_id
-                                   ORDER BY created_at DESC
-                               ) AS rn
-                        FROM rack_states
-                    ) ranked
-                    WHERE rn = 1
-                ) rs ON rs.rack_id = r.id
-
-                LEFT JOIN activities a ON rs.activity_id = a.id
-                LEFT JOIN cable_type ct ON rs.cable_type_id = ct.id
-                LEFT JOIN statuses s ON rs.status_id = s.id
-                LEFT JOIN technicians t ON rs.created_by = t.id
-
-                WHERE r.dh = :selected_dh
-                ORDER BY r.name, rs.created_at DESC NULLS LAST;
-            """), {"selected_dh": selected_dh})
-
-            rows = result.fetchall()
-            if rows:
-                df = pd.DataFrame([dict(row._mapping) for row in rows])
-
-                with st.expander("🔍 Filters"):
-                    for col in ["rack_name", "su", "lu"]:
-                        if col in df.columns:
-                            options = df[col].dropna().unique().tolist()
-                            selected = st.multiselect(f"Filter by {col}", options, key=f"filter_{col}")
-                            if selected:
-                                df = df[df[col].isin(selected)]
-
-                st.dataframe(df, use_container_width=True)
-            else:
-                st.info("No data for selected DH.")
+        rack_browser.render(engine, selected_dh, DATAHALL_REPORT_SQL, key="report_racks", status_filter=True)
 
     # LOCAL_TIMEZONE = "America/Chicago"
     # today_local = datetime.now(ZoneInfo(LOCAL_TIMEZONE)).date()
     selected_date = st.date_input("📅 Select date", value=today_local)
-    start_datetime = datetime.combine(selected_date, time.min).replace(tzinfo=ZoneInfo(LOCAL_TIMEZONE))
-    end_datetime = start_datetime + timedelta(days=1)
+    start_datetime, end_datetime = dates.day_bounds(selected_date, project_tz)
 
-    tz = pytz.timezone('America/Chicago')
-    date = datetime.strptime('2025-07-22', '%Y-%m-%d')
-    
-    # today_local = datetime.now(ZoneInfo(LOCAL_TIMEZONE)).date()
+    profiler.lap("datahall")
 
-    
-    start = tz.localize(date).astimezone(pytz.UTC)
-    end = tz.localize(date + timedelta(days=1)).astimezone(pytz.UTC)
+    state_filters = FilterSpec({"rack": "r.id", "created_by": "u.id"})
+    with st.expander("🔍 Filters"):
+        filters.multiselect(state_filters, "rack", "Filter by Rack", reference.racks(), "filter_by_rack_name")
+        filters.multiselect(state_filters, "created_by", "Filter by Created By", reference.technicians(), "filter_by_created_by")
 
-    # engine = get_engine()
     with engine.connect() as conn:
-        rows = conn.execute(text("""
-            SELECT DISTINCT ON (rs.rack_id, rs.activity_id, rs.cable_type_id, rs.position, rs.status_id)
-                r.name AS rack_name,
-                r.dh,
-                r.su,
-                rs.position,
-                a.name AS activity,
-                ct.name AS cable_type,
-                s.name AS status,
-                rs.quantity,
-                rs.percent,
-                (
-                    SELECT STRING_AGG(DISTINCT t2.name, ', ')
-                    FROM technician_tasks tt2
-                    JOIN technicians t2 ON t2.id = tt2.technician_id
-                    WHERE tt2.rack_id = rs.rack_id
-                      AND tt2.activity_id = rs.activity_id
-                      AND tt2.cable_type_id = rs.cable_type_id
-                      AND DATE(tt2.timestamp) = :today
-                ) AS technicians,
-                u.name AS created_by,
-                rs.created_at AS created_at                 
-            FROM rack_states rs
-            JOIN racks r ON r.id = rs.rack_id
-            LEFT JOIN activities a ON a.id = rs.activity_id
-            LEFT JOIN cable_type ct ON ct.id = rs.cable_type_id
-            LEFT JOIN statuses s ON s.id = rs.status_id
-            LEFT JOIN technicians u ON u.id = rs.created_by
-            WHERE DATE(rs.created_at) = :today    
-            ORDER BY rs.rack_id, rs.activity_id, rs.cable_type_id, rs.position, rs.status_id, rs.created_at DESC;
-        """), {
-            "selected_date": selected_date,
-            "tz": LOCAL_TIMEZONE,
-            "today": selected_date,
-            "start_datetime": start, 
-            "end_datetime": end
-            # "start_datetime": start_datetime,
-            # "end_datetime": end_datetime
+        rows = conn.execute(text(DAILY_RACK_REPORT_SQL.format(filters=state_filters.sql())), {
+            "start_datetime": start_datetime,
+            "end_datetime": end_datetime,
+            **state_filters.params()
         }).fetchall()
+    profiler.lap("query")
 
-    if not rows:
+    if not rows and not state_filters.selected:
         st.info("No records found for the selected date.")
         return
 
     df = pd.DataFrame([dict(row._mapping) for row in rows])
-
-    with st.expander("🔍 Filters"):
-        if "rack_name" in df.columns:
-            rack_options = df["rack_name"].dropna().unique().tolist()
-            selected_racks = st.multiselect("Filter by Rack", rack_options, key="filter_by_rack_name")
-            if selected_racks:
-                df = df[df["rack_name"].isin(selected_racks)]
-
-        if "created_by" in df.columns:
-            created_by_options = df["created_by"].dropna().unique().tolist()
-            selected_creators = st.multiselect("Filter by Created By", created_by_options, key="filter_by_created_by")
-            if selected_creators:
-                df = df[df["created_by"].isin(selected_creators)]
+    profiler.lap("build")
 
     st.dataframe(df, use_container_width=True)
     
     if st.button("📄 Generate PDF report for today"):
         today = selected_date
         with engine.connect() as conn:
-            dhs = conn.execute(text("""
-                SELECT DISTINCT r.dh
-                FROM rack_states rs
-                JOIN racks r ON rs.rack_id = r.id
-                WHERE DATE(rs.created_at) = :today
-            """), {"today": today}).fetchall()
-
-            dh_list = [row[0] for row in dhs]
-            pdf_buffer = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
-            doc = SimpleDocTemplate(pdf_buffer.name, pagesize=A4)
-            styles = getSampleStyleSheet()
-            story = []
-
-            story.append(Paragraph(f"<b>📅 Report for: {today.strftime('%Y-%m-%d')}</b>", styles["Title"]))
-            story.append(Spacer(1, 12))
-
-            for dh in dh_list:
-                story.append(Paragraph(f"<b>📌 Datahall: {dh}</b>", styles["Heading2"]))
-                statuses = conn.execute(text("""
-                    SELECT DISTINCT s.name
-                    FROM rack_states rs
-                    JOIN racks r ON rs.rack_id = r.id
-                    JOIN statuses s ON rs.status_id = s.id
-                    WHERE r.dh = :dh AND DATE(rs.created_at) = :today
-                """), {"dh": dh, "today": today}).fetchall()
-
-                for status_row in statuses:
-                    status = status_row[0]
-                    story.append(Paragraph(f"<b>Status: {status}</b>", styles["Heading3"]))
-
-                    summary = conn.execute(text("""
-                        SELECT a.name as activity, ct.name as cable_type, COUNT(DISTINCT rs.rack_id) as rack_count
-                        FROM rack_states rs
-                        JOIN racks r ON rs.rack_id = r.id
-                        JOIN activities a ON rs.activity_id = a.id
-                        JOIN cable_type ct ON rs.cable_type_id = ct.id
-                        JOIN statuses s ON rs.status_id = s.id
-                        WHERE r.dh = :dh AND DATE(rs.created_at) = :today AND s.name = :status
-                        GROUP BY a.name, ct.name
-                        ORDER BY a.name, ct.name
-                    """), {"dh": dh, "today": today, "status": status}).fetchall()
-
-                    if summary:
-                        for row in summary:
-                            story.append(Paragraph(f"• Activity: <b>{row.activity}</b>, Cable: <b>{row.cable_type}</b>, Racks: <b>{row.rack_count}</b>", styles["Normal"]))
-                    else:
-                        story.append(Paragraph("No data for this status.", styles["Italic"]))
-
-                    story.append(Spacer(1, 6))
-                story.append(Spacer(1, 12))
-
-            doc.build(story)
-
-            with open(pdf_buffer.name, "rb") as f:
-                st.download_button(
-                    label="📥 Download PDF",
-                    data=f.read(),
-                    file_name=f"daily_report_{today}.pdf",
-                    mime="application/pdf"
-                )
-
-            os.unlink(pdf_buffer.name)
+            pdf = report_cache.get_or_render(conn, today, user.get("project"), project_tz)
+
+        st.download_button(
+            label="📥 Download PDF",
+            data=pdf,
+            file_name=f"daily_report_{today}.pdf",
+            mime="application/pdf"
+        )
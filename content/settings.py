@@ -1,10 +1,50 @@
-from db import get_engine
+from db import bulk_upsert, get_engine
 import pandas as pd
 import streamlit as st
 from sqlalchemy import text
-import re
 from auth import encode_email, decode_email
 
+from utils import dates, reference, roster, table_sync
+
+PROJECT_TYPES = {"project": "text", "time_zone": "text", "customer": "text"}
+
+TASK_TABLES = ("technician_tasks", "technician_current_task")
+
+
+def _lookup_editor(engine, table, label, editor_key, task_column):
+    with engine.connect() as conn:
+        original = pd.read_sql(f"SELECT id, name FROM {table} ORDER BY id", conn)
+
+    edited_df = st.data_editor(
+        original.copy(),
+        num_rows="dynamic",
+        use_container_width=True,
+        disabled=["id"],
+        key=editor_key
+    )
+
+    if st.button(f"💾 Save {label.lower()}"):
+        edited_df = edited_df.assign(name=edited_df["name"].astype("string").str.strip())
+        # Clearing a name removes the row, as before.
+        edited_df = edited_df[edited_df["name"].fillna("") != ""]
+
+        duplicated = table_sync.duplicates(edited_df, "name")
+        if duplicated:
+            st.warning(f"Duplicate {label.lower()}: {', '.join(duplicated)}")
+            return
+
+        changes = table_sync.diff(original, edited_df, "id", ["name"])
+        with engine.begin() as conn:
+            table_sync.apply(
+                conn, table, changes, "id", {"id": "integer", "name": "text"},
+                dependents=[(task_table, task_column) for task_table in TASK_TABLES],
+            )
+
+        reference.invalidate(table)
+        st.success(f"✅ {label} saved")
+        st.rerun()
+
+
 def run():
     st.title("⚙️ Settings")
 
@@ -15,169 +55,17 @@ def run():
     # ====== Locations ======
     with col1:
         st.subheader("📍 Locations")
-
-        with engine.connect() as conn:
-            df_loc = pd.read_sql("SELECT id, name FROM locations ORDER BY id", conn)
-
-        edited_df = st.data_editor(
-            df_loc.copy(),
-            num_rows="dynamic",
-            use_container_width=True,
-            key="locations_editor"
-        )
-
-        if st.button("💾 Save locations"):
-            seen = set()
-            error = False
-
-            with engine.begin() as conn:
-                new_ids = []
-
-                for i, row in edited_df.iterrows():
-                    name = str(row["name"]).strip()
-                    if not name:
-                        continue
-                    lname = name.lower()
-                    if lname in seen:
-                        st.warning(f"Duplicate location: {name}")
-                        error = True
-                        continue
-                    seen.add(lname)
-
-                    if i < len(df_loc):
-                        id_ = int(df_loc.iloc[i]["id"])
-                        new_ids.append(id_)
-                        # Update
-                        conn.execute(text("UPDATE locations SET name = :name WHERE id = :id"),
-                                     {"name": name, "id": id_})
-                    else:
-                        # Insert
-                        result = conn.execute(text("INSERT INTO locations (name) VALUES (:name) RETURNING id"), {"name": name})
-                        new_id = result.scalar()
-                        new_ids.append(new_id)
-
-                # Delete removed
-                old_ids = set(df_loc["id"])
-                deleted_ids = old_ids - set(new_ids)
-                for del_id in deleted_ids:
-                    conn.execute(text("DELETE FROM technician_tasks WHERE location_id = :id"), {"id": del_id})
-                    conn.execute(text("DELETE FROM locations WHERE id = :id"), {"id": del_id})
-
-            if not error:
-                st.success("✅ Locations saved")
-                st.rerun()
+        _lookup_editor(engine, "locations", "Locations", "locations_editor", "location_id")
 
     # ====== Activities ======
     with col2:
         st.subheader("⚙️ Activities")
+        _lookup_editor(engine, "activities", "Activities", "activities_editor", "activity_id")
 
-        with engine.connect() as conn:
-            df_act = pd.read_sql("SELECT id, name FROM activities ORDER BY id", conn)
-
-        edited_df = st.data_editor(
-            df_act.copy(),
-            num_rows="dynamic",
-            use_container_width=True,
-            key="activities_editor"
-        )
-
-        if st.button("💾 Save activities"):
-            seen = set()
-            error = False
-
-            with engine.begin() as conn:
-                new_ids = []
-
-                for i, row in edited_df.iterrows():
-                    name = str(row["name"]).strip()
-                    if not name:
-                        continue
-                    lname = name.lower()
-                    if lname in seen:
-                        st.warning(f"Duplicate activity: {name}")
-                        error = True
-                        continue
-                    seen.add(lname)
-
-                    if i < len(df_act):
-                        id_ = int(df_act.iloc[i]["id"])
-                        new_ids.append(id_)
-                        # Update
-                        conn.execute(text("UPDATE activities SET name = :name WHERE id = :id"),
-                                     {"name": name, "id": id_})
-                    else:
-                        # Insert
-                        result = conn.execute(text("INSERT INTO activities (name) VALUES (:name) RETURNING id"), {"name": name})
-                        new_id = result.scalar()
-                        new_ids.append(new_id)
-
-                # Delete removed
-                old_ids = set(df_act["id"])
-                deleted_ids = old_ids - set(new_ids)
-                for del_id in deleted_ids:
-                    conn.execute(text("DELETE FROM technician_tasks WHERE activity_id = :id"), {"id": del_id})
-                    conn.execute(text("DELETE FROM activities WHERE id = :id"), {"id": del_id})
-
-            if not error:
-                st.success("✅ Activities saved")
-                st.rerun()
     with col3:
         st.subheader("🔌 Cable Types")
+        _lookup_editor(engine, "cable_type", "Cable types", "cable_editor", "cable_type_id")
 
-        with engine.connect() as conn:
-            df_cable = pd.read_sql("SELECT id, name FROM cable_type ORDER BY id", conn)
-
-        edited_df = st.data_editor(
-            df_cable.copy(),
-            num_rows="dynamic",
-            use_container_width=True,
-            key="cable_editor"
-        )
-
-        if st.button("💾 Save cable types"):
-            seen = set()
-            error = False
-
-            with engine.begin() as conn:
-                new_ids = []
-
-                for i, row in edited_df.iterrows():
-                    name = str(row["name"]).strip()
-                    if not name:
-                        continue
-                    lname = name.lower()
-                    if lname in seen:
-                        st.warning(f"Duplicate cable type: {name}")
-                        error = True
-                        continue
-                    seen.add(lname)
-
-                    if i < len(df_cable):
-                        id_ = int(df_cable.iloc[i]["id"])
-                        new_ids.append(id_)
-                        # Update
-                        conn.execute(text("UPDATE cable_type SET name = :name WHERE id = :id"),
-                                     {"name": name, "id": id_})
-                    else:
-                        # Insert
-                        result = conn.execute(
-                            text("INSERT INTO cable_type (name) VALUES (:name) RETURNING id"),
-                            {"name": name}
-                        )
-                        new_id = result.scalar()
-                        new_ids.append(new_id)
-
-                # Delete removed cable types
-                old_ids = set(df_cable["id"])
-                deleted_ids = old_ids - set(new_ids)
-                for del_id in deleted_ids:
-                    conn.execute(text("DELETE FROM technician_tasks WHERE cable_type_id = :id"), {"id": del_id})
-                    conn.execute(text("DELETE FROM cable_type WHERE id = :id"), {"id": del_id})
-
-            if not error:
-                st.success("✅ Cable types saved")
-                st.rerun()
-            
     # ====== Technicians ======
     st.subheader("👷 Technicians")
 
@@ -191,16 +79,17 @@ def run():
 
     tech_display = df_tech[["id", "name", "email", "team_lead", "project", "activ", "is_teamlead", "admin"]].copy()
     tech_display["del"] = False
-    tech_display["team_lead_name"] = tech_display["team_lead"].map(team_leads).fillna("—")
+    tech_display["team_lead_name"] = tech_display["team_lead"].map(team_leads).fillna(roster.NO_TEAM_LEAD)
 
     team_lead_names = list(team_leads.values())
-    team_lead_names.insert(0, "—")
+    team_lead_names.insert(0, roster.NO_TEAM_LEAD)
     # df_tech["encoded_email"] = encode_email(df_tech["email"])
 
     edited = st.data_editor(
-        tech_display[["name", "email", "team_lead_name", "project", "is_teamlead", "activ", "admin", "del"]],
+        tech_display[["id", "name", "email", "team_lead_name", "project", "is_teamlead", "activ", "admin", "del"]],
         num_rows="dynamic",
         use_container_width=True,
+        disabled=["id"],
         key="technicians_editor",
         column_config={
             "team_lead_name": st.column_config.SelectboxColumn(
@@ -217,88 +106,24 @@ def run():
     )
 
     if st.button("💾 Save technicians"):
-        emails_seen = set()
-        email_regex = r"^[\w\.-]+@[\w\.-]+\.\w+$"
-        error = False
-
         with engine.begin() as conn:
-            for idx, row in edited.iterrows():
-                name = str(row["name"]).strip()
-                email = str(row["email"]).strip().lower()
-                team_lead_name = str(row["team_lead_name"]).strip()
-                project = str(row["project"]).strip()
-                is_teamlead = bool(row["is_teamlead"])
-                activ = bool(row["activ"])
-                admin = bool(row["admin"])
-                to_delete = row["del"]
-
-                team_lead_id = None
-                for tid, tname in team_leads.items():
-                    if tname == team_lead_name:
-                        team_lead_id = tid
-                        break
-
-                if not name and not email:
-                    continue
-
-                if not name or not email:
-                    st.warning(f"Row {idx + 1}: name and email")
-                    error = True
-                    continue
-
-                if not re.match(email_regex, email):
-                    st.warning(f"Row {idx + 1}: wrong email: '{email}'")
-                    error = True
-                    continue
-
-                if email in emails_seen:
-                    st.warning(f"Row {idx + 1}: email '{email}' already exist.")
-                    error = True
-                    continue
-
-                emails_seen.add(email)
-
-                project_value = row["project"] if row["project"] and row["project"] != "None" else None
-                
-                if idx >= len(df_tech):
-                    if not to_delete:
-                        conn.execute(text("""
-                            INSERT INTO technicians (name, email, team_lead, project, is_teamlead, activ, admin)
-                            VALUES (:name, :email, :team_lead, :project, :is_teamlead, :activ, :admin)
-                        """), {
-                            "name": name, "email": email,
-                            "team_lead": team_lead_id, "project": project_value, "is_teamlead": is_teamlead, "activ": activ, "admin": admin,
-                        })
-                else:
-                    tech_id = df_tech.iloc[idx]["id"]
-                    if to_delete:
-                        conn.execute(text("DELETE FROM technician_tasks WHERE technician_id = :id"), {"id": int(tech_id)})
-                        conn.execute(text("DELETE FROM technicians WHERE id = :id"), {"id": int(tech_id)})
-                    else:
-                        conn.execute(text("""
-                            UPDATE technicians
-                            SET name = :name,
-                                email = :email,
-                                team_lead = :team_lead,
-                                project = :project,
-                                is_teamlead = :is_teamlead,
-                                activ = :activ,
-                                admin = :admin
-                            WHERE id = :id
-                        """), {
-                            "name": name, "email": email,
-                            "team_lead": int(team_lead_id) if team_lead_id is not None else None,
-                            "project": project_value,
-                            "is_teamlead": is_teamlead,
-                            "activ": activ,
-                            "admin": admin,
-                            "id": int(tech_id)
-                        })
-
-        if not error:
-            st.success("Updated")
+            summary = roster.save(conn, df_tech, edited, team_leads)
+
+        if summary["errors"]:
+            for message in summary["errors"]:
+                st.warning(message)
+        else:
+            reference.invalidate("technicians", "team_leads")
+            st.session_state["roster_summary"] = summary
             st.rerun()
 
+    summary = st.session_state.pop("roster_summary", None)
+    if summary:
+        st.success(
+            f"Updated: {summary['inserted']} added, {summary['updated']} changed, {summary['deleted']} deleted "
+            f"(validation {summary['validate_ms']} ms, write {summary['write_ms']} ms)"
+        )
+
 
     st.subheader("📂 Manage Projects")
     with engine.connect() as conn:
@@ -323,32 +148,33 @@ def run():
         submitted = st.form_submit_button("💾 Save Changes")
 
     if submitted:
+        edited_df = edited_df.assign(**{
+            column: edited_df[column].astype("string").str.strip().replace("", pd.NA)
+            for column in PROJECT_TYPES
+        })
+        edited_df = edited_df[edited_df["project"].notna()]
+        if edited_df["time_zone"].isna().any():
+            st.warning("Every project needs a time zone.")
+            st.stop()
+
+        duplicated = table_sync.duplicates(edited_df, "project")
+        if duplicated:
+            st.warning(f"Duplicate projects: {', '.join(duplicated)}")
+            st.stop()
+
+        zones = edited_df["time_zone"].unique()
+        invalid = [tz for tz in zones if not dates.is_valid_zone(tz)]
+        if invalid:
+            st.warning(f"Unknown time zones: {', '.join(invalid)}")
+            st.stop()
+
+        changes = table_sync.diff(df, edited_df, "project", ["time_zone", "customer"])
         with engine.begin() as conn:
-            for _, row in edited_df.iterrows():
-                if pd.notna(row["project"]) and pd.notna(row["time_zone"]):
-                    existing = conn.execute(text("""
-                        SELECT 1 FROM projects WHERE project = :project
-                    """), {"project": str(row["project"]).strip()}).fetchone()
-
-                    if existing:
-                        conn.execute(text("""
-                            UPDATE projects
-                            SET time_zone = :time_zone, customer = :customer
-                            WHERE project = :project
-                        """), {
-                            "project": str(row["project"]).strip(),
-                            "time_zone": str(row["time_zone"]).strip(),
-                            "customer": str(row["customer"]).strip() if pd.notna(row["customer"]) else None
-                        })
-                    else:
-                        conn.execute(text("""
-                            INSERT INTO projects (project, time_zone, customer)
-                            VALUES (:project, :time_zone, :customer)
-                        """), {
-                            "project": str(row["project"]).strip(),
-                            "time_zone": str(row["time_zone"]).strip(),
-                            "customer": str(row["customer"]).strip() if pd.notna(row["customer"]) else None
-                        })
+            if changes.deleted:
+                conn.execute(text("DELETE FROM projects WHERE project = ANY(:projects)"),
+                             {"projects": list(changes.deleted)})
+            bulk_upsert(conn, "projects", pd.concat([changes.inserted, changes.updated]), ["project"], PROJECT_TYPES)
 
+        reference.invalidate("projects")
         st.success("✅ Projects updated successfully!")
-        st.rerun()
\ No newline at end of file
+        st.rerun()
@@ -2,7 +2,28 @@
 import streamlit as st
 from sqlalchemy import text
 from db import get_engine
-import pandas as pd
+
+from utils import calculation, rack_browser, rack_import, reference
+
+RACK_RESULTS_SQL = """
+    SELECT
+        r.id,
+        r.name AS rack_name,
+        r.dh,
+        r.su,
+        r.lu,
+        r.row,
+        a.name AS activity,
+        ct.name AS cable_type,
+        rr.quantity,
+        rr.measurement
+    FROM racks r
+    LEFT JOIN rack_results rr ON rr.rack_id = r.id
+    LEFT JOIN activities a ON a.id = rr.activity_id
+    LEFT JOIN cable_type ct ON ct.id = rr.cable_type_id
+    WHERE r.id = ANY(:rack_ids)
+    ORDER BY r.name, r.id
+"""
 
 def run():
     st.title("📦 Sources")
@@ -13,12 +34,8 @@ def run():
     st.markdown("---")
     st.subheader("➕ Add New Rack")
 
-    with engine.connect() as conn:
-        activity_rows = conn.execute(text("SELECT id, name FROM activities ORDER BY name")).fetchall()
-        cable_rows = conn.execute(text("SELECT id, name FROM cable_type ORDER BY name")).fetchall()
-
-    activity_options = {row.id: row.name for row in activity_rows}
-    cable_type_options = {row.id: row.name for row in cable_rows}
+    activity_options = reference.activities().id_to_name
+    cable_type_options = reference.cable_types().id_to_name
 
     with st.form("add_rack_form"):
         name = st.text_input("Rack Name", max_chars=50)
@@ -40,6 +57,7 @@ def run():
             st.error("Please fill in at least Rack Name and DH.")
             st.stop()
 
+        rack_added = results_added = False
         with engine.begin() as conn:
 
             existing = conn.execute(text("""
@@ -74,6 +92,7 @@ def run():
                     "row": row_value.strip() or None
                 })
                 rack_id = result.scalar()
+                rack_added = True
                 st.success(f"✅ Rack '{name}' added.")
 
             if activity and position and cable_type and quantity > 0:
@@ -88,12 +107,52 @@ def run():
                     "quantity": quantity,
                     "measurement": measurement.strip() or None
                 })
+                results_added = True
                 st.success("✅ rack_results record added.")
             else:
                 st.warning("⚠️ rack_results not added. Make sure activity, position, cable_type and quantity are filled.")
-    
+
+        if rack_added:
+            reference.invalidate("racks")
+        if results_added:
+            calculation.invalidate_plan_cache()
         st.rerun()
 
+    st.markdown("---")
+    st.subheader("📥 Bulk Import")
+    st.caption(
+        "CSV or XLSX with columns: rack, dh, su, lu, row, activity, cable_type, position, quantity, measurement. "
+        "Existing racks are updated by name and DH; planned quantities by rack, activity, cable type and position."
+    )
+
+    uploaded = st.file_uploader("Racks file", type=["csv", "xlsx"], key="rack_import_file")
+    if uploaded is not None:
+        try:
+            raw = rack_import.read_upload(uploaded)
+        except Exception as e:
+            st.error(f"❌ Could not read file: {e}")
+            st.stop()
+
+        valid, rejected = rack_import.validate(raw, reference.activities(), reference.cable_types())
+        st.write(f"{len(valid)} rows ready, {len(rejected)} rejected.")
+        if not rejected.empty:
+            st.dataframe(rejected, use_container_width=True)
+            st.download_button(
+                "⬇️ Download rejected rows", rejected.to_csv(index_label="line"),
+                file_name="rejected_racks.csv", mime="text/csv",
+            )
+
+        if not valid.empty and st.button("📥 Import", key="rack_import_submit"):
+            with engine.begin() as conn:
+                stats = rack_import.load(conn, valid)
+            reference.invalidate("racks")
+            calculation.invalidate_plan_cache()
+            st.success(
+                f"✅ Imported {stats['rows']} rows in {stats['seconds']} s ({stats['rows_per_second']} rows/s): "
+                f"{stats['racks']} racks, {stats['results_inserted']} planned quantities added, "
+                f"{stats['results_updated']} updated."
+            )
+
     st.markdown("---")
     st.subheader("📋 Racks")
 
@@ -104,30 +163,4 @@ def run():
     selected_dh = st.selectbox("📍 Select Datahall (DH)", dh_options)
 
     if selected_dh:
-        with engine.connect() as conn:
-            result = conn.execute(text("""
-                SELECT
-                    r.id,
-                    r.name AS rack_name,
-                    r.dh,
-                    r.su,
-                    r.lu,
-                    r.row,
-                    a.name AS activity,
-                    ct.name AS cable_type,
-                    rr.quantity,
-                    rr.measurement
-                FROM racks r
-                LEFT JOIN rack_results rr ON rr.rack_id = r.id
-                LEFT JOIN activities a ON a.id = rr.activity_id
-                LEFT JOIN cable_type ct ON ct.id = rr.cable_type_id
-                WHERE r.dh = :selected_dh
-                ORDER BY r.name
-            """), {"selected_dh": selected_dh})
-
-            rows = result.fetchall()
-            if rows:
-                df = pd.DataFrame([dict(row._mapping) for row in rows])
-                st.dataframe(df, use_container_width=True)
-            else:
-                st.info("No racks found for selected DH.")
+        rack_browser.render(engine, selected_dh, RACK_RESULTS_SQL, key="sources_racks")
@@ -2,15 +2,32 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, date, time, timezone
 from sqlalchemy import text
-from zoneinfo import ZoneInfo
 from db import get_engine
 from auth import get_user_by_email, encode_email, decode_email, generate_token, get_user_by_token
 import pytz
 
+from utils import dates, profiler, reference, write_queue
+
+def last_task(user):
+    # The technician's task from today in the project time zone, if any.
+    tz = dates.project_timezone(user)
+    start, end = dates.day_bounds(dates.today(tz), tz)
+    with get_engine().connect() as conn:
+        row = conn.execute(text("""
+            SELECT location_id, activity_id, cable_type_id, rack
+            FROM technician_current_task
+            WHERE technician_id = :tech_id
+              AND timestamp >= :start AND timestamp < :end
+        """), {
+            "tech_id": user["id"],
+            "start": start,
+            "end": end
+        }).first()
+    return dict(row._mapping) if row else None
+
 def run():
     st.title("📋 Survey")
 
-    engine = get_engine()
     query_params = st.query_params
     url_email = query_params.get("email", "").lower()
     # url_email = decode_email(query_params.get("email", "").lower())
@@ -50,35 +67,12 @@ def run():
     st.session_state.email = email
 
 
-    LOCAL_TIMEZONE = "America/Chicago"
-    today_local = datetime.now(ZoneInfo(LOCAL_TIMEZONE)).date()
-
     LOCAL_TIMEZONE = "America/Chicago"
     timezone = pytz.timezone(LOCAL_TIMEZONE)
-    today_local = datetime.now(ZoneInfo(LOCAL_TIMEZONE)).date()
-    # start = datetime.combine(today_local, time.min).astimezone(ZoneInfo("UTC"))
-    # end = datetime.combine(today_local, time.max).astimezone(ZoneInfo("UTC"))
-
-    def load_last_task(user_id):
-        with engine.connect() as conn:
-            row = conn.execute(text("""
-                SELECT location_id, activity_id, cable_type_id, rack
-                FROM technician_tasks
-                WHERE technician_id = :tech_id
-                  AND DATE(timestamp) = :today
-                ORDER BY timestamp DESC
-                LIMIT 1
-            """), {
-                "tech_id": user_id,
-                # in query # AND timestamp >= :start AND timestamp < :end
-                # "start": start,
-                # "end": end
-                "today": today_local,
-                "tz": LOCAL_TIMEZONE
-            }).first()
-
-        if row:
-            task = dict(row._mapping)
+
+    def load_last_task(user):
+        task = last_task(user)
+        if task:
             st.session_state.last_location_id = task["location_id"]
             st.session_state.last_activity_id = task["activity_id"]
             st.session_state.last_cable_type_id = task["cable_type_id"]
@@ -94,21 +88,17 @@ def run():
         if user:
             st.session_state.user_data = user
             st.session_state.email_checked = True
-            load_last_task(user["id"])
+            load_last_task(user)
         else:
             st.error("User not found.")
 
     if st.button("Check email"):
-        with engine.connect() as conn:
-            row = conn.execute(
-                text("SELECT * FROM technicians WHERE LOWER(email) = :email"),
-                {"email": email.lower()}
-            ).first()
+        user = get_user_by_email(email)
 
-        if row:
+        if user:
             st.session_state.email_checked = True
-            st.session_state.user_data = dict(row._mapping)
-            load_last_task(row.id)
+            st.session_state.user_data = user
+            load_last_task(st.session_state.user_data)
             st.success("Email verified!")
         else:
             st.error("User not found.")
@@ -116,20 +106,15 @@ def run():
     if st.session_state.email_checked:
         user = st.session_state.user_data
 
-        with engine.connect() as conn:
-            locations = conn.execute(text("SELECT id, name FROM locations ORDER BY name")).fetchall()
-            activities = conn.execute(text("SELECT id, name FROM activities ORDER BY name")).fetchall()
-            cable_types = conn.execute(text("SELECT id, name FROM cable_type ORDER BY name")).fetchall()
-            racks = conn.execute(text("SELECT id, name, dh FROM racks ORDER BY name")).fetchall()
-
-        loc_options = {loc.name: loc.id for loc in locations}
-        act_options = {act.name: act.id for act in activities}
-        cable_options = {ct.name: ct.id for ct in cable_types}
-        racks_options = {f"{rack.name} ({rack.dh})": rack.id for rack in racks}
+        loc_options = reference.locations().name_to_id
+        act_options = reference.activities().name_to_id
+        cable_options = reference.cable_types().name_to_id
+        racks_options = reference.racks().name_to_id
 
-        act_id_to_name = {v: k for k, v in act_options.items()}
-        cable_id_to_name = {v: k for k, v in cable_options.items()}
-        rack_id_to_name = {v: k for k, v in racks_options.items()}
+        act_id_to_name = reference.activities().id_to_name
+        cable_id_to_name = reference.cable_types().id_to_name
+        rack_id_to_name = reference.racks().id_to_name
+        profiler.lap("reference")
 
         default_loc = next((name for name, id_ in loc_options.items()
                             if id_ == st.session_state.get("last_location_id")), None)
@@ -160,21 +145,14 @@ def run():
                 # now = datetime.now()
                 now_utc = datetime.utcnow().replace(tzinfo=pytz.utc)
                 now_in_timezone = now_utc.astimezone(timezone)
-                with engine.begin() as conn:
-                    conn.execute(text("""
-                        INSERT INTO technician_tasks (
-                            technician_id, location_id, activity_id, cable_type_id, rack_id, source, timestamp
-                        )
-                        VALUES (:technician_id, :location_id, :activity_id, :cable_type_id, :rack_id, :source, :timestamp)
-                    """), {
-                        "technician_id": user["id"],
-                        "location_id": loc_options[selected_location],
-                        "activity_id": act_options[selected_activity],
-                        "cable_type_id": cable_options[selected_cable],
-                        "rack_id": racks_options[selected_rack],
-                        "source": user["id"],
-                        "timestamp": now_in_timezone
-                    })
+                write_queue.submit(pd.DataFrame([{
+                    "technician_id": user["id"],
+                    "location_id": loc_options[selected_location],
+                    "activity_id": act_options[selected_activity],
+                    "cable_type_id": cable_options[selected_cable],
+                    "rack_id": racks_options[selected_rack],
+                    "source": user["id"],
+                }]), now_in_timezone)
 
                 st.success("Saved!")
                 st.rerun()
@@ -1,12 +1,87 @@
 from datetime import datetime
-from zoneinfo import ZoneInfo
 import pandas as pd
 import streamlit as st
 from sqlalchemy import text, select
 from db import get_engine
 import pytz
 
-from utils import calculation
+from utils import calculation, dates, profiler, rack_state, reference, write_queue
+
+BLANK_RACK = 139
+BLANK_ACTIVITY = 4
+IN_PROGRESS_STATUS = 1
+ACK_WAIT_SECONDS = 2
+
+ASSIGNMENT_COLUMNS = ["Location", "Activity", "Cable Type", "Rack", "Position"]
+
+LATEST_TASK_COLUMNS = [
+    "technician_id", "location_id", "activity_id", "cable_type_id", "rack_id", "position", "timestamp", "created_by",
+]
+
+
+def _changed_rows(df, edited_df):
+    before = df[ASSIGNMENT_COLUMNS].fillna("")
+    after = edited_df[ASSIGNMENT_COLUMNS].fillna("")
+    qty_before = pd.to_numeric(df["Quantity"], errors="coerce").fillna(0).astype(int)
+    qty_after = pd.to_numeric(edited_df["Quantity"], errors="coerce").fillna(0).astype(int)
+
+    changed = (before != after).any(axis=1) | (qty_before != qty_after)
+    return edited_df[changed].assign(Quantity=qty_after[changed].clip(lower=0))
+
+
+def build_assignments(technicians, latest, loc_names, act_names, cable_names, rack_names):
+    grid = technicians.merge(latest, how="left", left_on="id", right_on="technician_id")
+    has_task = grid["technician_id"].notna()
+
+    def first(names):
+        return next(iter(names.values()), None)
+
+    return pd.DataFrame({
+        "#": range(1, len(grid) + 1),
+        "Technician": grid["name"],
+        "Location": grid["location_id"].map(loc_names).fillna(first(loc_names)),
+        "Activity": grid["activity_id"].map(act_names).fillna(first(act_names)),
+        "Cable Type": grid["cable_type_id"].map(cable_names).fillna(first(cable_names)),
+        "Rack": grid["rack_id"].map(rack_names).fillna("-"),
+        "Position": grid["position"].where(has_task, "Varies"),
+        "Team lead": grid["team_lead_name"],
+        "Created by": grid["created_by"].where(has_task, "-"),
+        "Quantity": 0,
+        "Time": grid["timestamp"].where(has_task, ""),
+    })
+
+
+def _save_assignments(conn, changes, team_lead_id, timestamp):
+    # Writes the rack states on conn and returns the task rows, which the caller
+    # hands to the write queue once conn has committed.
+    tasks = pd.DataFrame({
+        "technician_id": changes["tech_id"],
+        "location_id": changes["loc_id"],
+        "activity_id": changes["act_id"],
+        "cable_type_id": changes["cable_id"],
+        "rack_id": changes["rack_id"],
+        "source": team_lead_id,
+        "position": changes["Position"],
+    })
+
+    states = changes[
+        changes["rack_id"].notna() & (changes["rack_id"] != BLANK_RACK)
+        & changes["act_id"].notna() & (changes["act_id"] != BLANK_ACTIVITY)
+    ]
+    if states.empty:
+        return tasks
+
+    states = pd.DataFrame({
+        "rack_id": states["rack_id"],
+        "activity_id": states["act_id"],
+        "cable_type_id": states["cable_id"],
+        "position": states["Position"],
+        "status_id": IN_PROGRESS_STATUS,
+        "quantity": states["Quantity"],
+    })
+    states["percent"] = calculation.percent_calculation_batch(states, conn=conn)
+    rack_state.insert_states(conn, states, team_lead_id, timestamp)
+    return tasks
 
 
 def run():
@@ -43,37 +118,27 @@ def run():
                 ORDER BY t1.name
             """), {"tl_id": team_lead_id}).fetchall()
 
-        locations = conn.execute(text("SELECT id, name FROM locations ORDER BY name NULLS FIRST")).fetchall()
-        activities = conn.execute(text("SELECT id, name FROM activities ORDER BY name NULLS FIRST")).fetchall()
-        cable_types = conn.execute(text("SELECT id, name FROM cable_type ORDER BY name NULLS FIRST")).fetchall()
-        # racks = conn.execute(text("SELECT id, name FROM raks ORDER BY name NULLS FIRST")).fetchall()
         # team_leads = conn.execute(text("SELECT id, name FROM technicians WHERE is_teamlead = True")).fetchone()
-        racks = conn.execute(text("SELECT id, name, dh FROM racks ORDER BY name NULLS FIRST")).fetchall()
 
-        tech_options = {tech.name: tech.id for tech in technicians}
-        tech_ids = [tech.id for tech in technicians]
-        tech_id_to_teamlead = {tech.id: tech.team_lead_name for tech in technicians}
         # team_lead_name = result.name if result else "-"
+    profiler.lap("query")
 
     if not technicians:
         st.info("You don't have a team.")
         return
 
-    loc_options = {loc.name: loc.id for loc in locations}
-    act_options = {act.name: act.id for act in activities}
-    cable_options = {ct.name: ct.id for ct in cable_types}
-    cable_id_to_name = {ct.id: ct.name for ct in cable_types}
-    # tech_options = {tech.name: tech.id for tech in technicians}
-    # tech_ids = [tech.id for tech in technicians]
-    racks_options = {f"{rack.name} ({rack.dh})": rack.id for rack in racks}
+    loc_options = reference.locations().name_to_id
+    act_options = reference.activities().name_to_id
+    cable_options = reference.cable_types().name_to_id
+    racks_options = reference.racks().name_to_id
 
     tech_options = {tech.name: tech.id for tech in technicians}
     tech_ids = [tech.id for tech in technicians]
-    tech_id_to_teamlead = {tech.id: tech.team_lead_name for tech in technicians}
 
-    today_local = datetime.now(ZoneInfo(LOCAL_TIMEZONE)).date()
+    project_tz = dates.project_timezone(user)
+    start, end = dates.day_bounds(dates.today(project_tz), project_tz)
+    profiler.lap("reference")
 
-    latest_tasks = {}
     with engine.connect() as conn:
         rows = conn.execute(text("""
             SELECT sub.technician_id,
@@ -84,39 +149,25 @@ def run():
             sub.position, 
             TO_CHAR(sub.timestamp, 'YYYY-MM-DD HH24:MI:SS') AS timestamp,
             u.name AS created_by
-            FROM (
-                SELECT *,
-                       ROW_NUMBER() OVER (PARTITION BY technician_id ORDER BY timestamp DESC) as rn
-                FROM technician_tasks
-                WHERE technician_id = ANY(:tech_ids)
-                  AND DATE(timestamp) = :today
-            ) sub
+            FROM technician_current_task sub
             LEFT JOIN technicians u ON u.id = sub.source
-            WHERE rn = 1"""), {
+            WHERE sub.technician_id = ANY(:tech_ids)
+              AND sub.timestamp >= :start AND sub.timestamp < :end"""), {
             "tech_ids": tech_ids,
-            "today": today_local,
-            "tz": LOCAL_TIMEZONE
+            "start": start,
+            "end": end
         }).fetchall()
-
-        for row in rows:
-            latest_tasks[row.technician_id] = dict(row._mapping)
-
-    df = pd.DataFrame([{
-        "#": i + 1,
-        "Technician": tech.name,
-        "Location": next((loc.name for loc in locations if loc.id == latest_tasks.get(tech.id, {}).get("location_id")), list(loc_options.keys())[0]),
-        "Activity": next((act.name for act in activities if act.id == latest_tasks.get(tech.id, {}).get("activity_id")), list(act_options.keys())[0]),
-        "Cable Type": cable_id_to_name.get(latest_tasks.get(tech.id, {}).get("cable_type_id"), list(cable_options.keys())[0]),
-        # "Rack": next((rack.name for rack in racks if rack.id == latest_tasks.get(tech.id, {}).get("rack_id")), "-"),
-        "Rack": next((f"{rack.name} ({rack.dh})" for rack in racks if rack.id == latest_tasks.get(tech.id, {}).get("rack_id")), "-"),
-        "Position": latest_tasks.get(tech.id, {}).get("position", "Varies"),
-        "Team lead": tech_id_to_teamlead.get(tech.id, "-"),
-        "Created by": latest_tasks.get(tech.id, {}).get("created_by", "-"),
-        # "Team lead": next((team_lead.name for team_lead in team_leads if team_lead.id == technicians.get(tech.id, {}).get("technician_id")), list(tech_ids.keys())[0]),
-        "Quantity": latest_tasks.get(tech.id, {}).get("quantity", 0),
-        # "Percent": latest_tasks.get(tech.id, {}).get("percent", 0),
-        "Time": latest_tasks.get(tech.id, {}).get("timestamp", "")
-    } for i, tech in enumerate(technicians)])
+    profiler.lap("query")
+
+    df = build_assignments(
+        pd.DataFrame(technicians, columns=["id", "name", "team_lead_name"]),
+        pd.DataFrame(rows, columns=LATEST_TASK_COLUMNS),
+        reference.locations().id_to_name,
+        reference.activities().id_to_name,
+        reference.cable_types().id_to_name,
+        reference.racks().id_to_name,
+    )
+    profiler.lap("build")
 
     with st.form("edit_tasks_form"):
         edited_df = st.data_editor(
@@ -142,98 +193,37 @@ def run():
 
     # if st.button("📂 Save tasks"):
     if submitted:
-        datetime_now = datetime.now()
-
-        
         now_utc = datetime.utcnow().replace(tzinfo=pytz.utc)
         now_in_timezone = now_utc.astimezone(timezone)
 
-        status_id = 1 # in progress
+        changes = _changed_rows(df, edited_df)
+        changes = changes.assign(
+            tech_id=changes["Technician"].map(tech_options),
+            loc_id=changes["Location"].map(loc_options),
+            act_id=changes["Activity"].map(act_options),
+            cable_id=changes["Cable Type"].map(cable_options),
+            rack_id=changes["Rack"].map(racks_options),
+        )
+        changes = changes[changes["tech_id"].notna() & changes["loc_id"].notna()]
+
         with engine.begin() as conn:
-            for idx, row in edited_df.iterrows():
-                original = df.iloc[idx]
-                if (
-                    row["Location"] == original["Location"] and
-                    row["Activity"] == original["Activity"] and
-                    row["Cable Type"] == original["Cable Type"] and
-                    row["Rack"] == original["Rack"]
-                    and row["Position"] == original["Position"]
-                    and int(row["Quantity"] if pd.notna(row["Quantity"]) else 0) == int(original["Quantity"] if pd.notna(original["Quantity"]) else 0)
-                    # and int(row["Percent"] if pd.notna(row["Percent"]) else 0) == int(original["Percent"] if pd.notna(original["Percent"]) else 0)
-                ):
-                    continue
-
-                tech_name = row["Technician"]
-                tech_id = tech_options.get(tech_name)
-                loc_id = loc_options.get(row["Location"])
-                act_id = act_options.get(row["Activity"])
-                cable_id = cable_options.get(row["Cable Type"])
-                rack_id = racks_options.get(row["Rack"])
-                position = row.get("Position")
-                quantity = max(0, int(row.get("Quantity", 0)))
-                # percent = min(100, max(0, int(row.get("Percent", 0))))
-                # percent = round(quantity / planned * 100, 1)
-
-                if tech_id and loc_id:
-                    if not act_id:
-                        act_id = None
-                    conn.execute(text("""
-                        INSERT INTO technician_tasks (
-                            technician_id, location_id, activity_id, cable_type_id, rack_id, source, position, timestamp
-                        )
-                        VALUES (:tech_id, :loc_id, :act_id, :cable_type_id, :rack_id, :source, :position, :timestamp)
-                    """), {
-                        "tech_id": tech_id,
-                        "loc_id": loc_id,
-                        "act_id": act_id,
-                        "cable_type_id": cable_id,
-                        "rack_id": rack_id,
-                        "source": team_lead_id,
-                        "position": position,
-                        "timestamp": now_in_timezone,
-                        "quantity": quantity
-                        # "percent": percent
-                    })
-
-                    blank_rack = 139
-                    blank_activity = 4
-                    if (rack_id is not None and not rack_id == blank_rack) and (act_id is not None and not act_id == blank_activity):
-                        conn.execute(text("""
-                            INSERT INTO rack_states (
-                                rack_id, activity_id, cable_type_id, created_by, position, created_at, status_id, quantity
-                        )
-                        VALUES (:rack_id, :act_id, :cable_type_id, :created_by, :position, :created_at, :status_id, :quantity)
-                        """), {
-                        "act_id": act_id,
-                        "cable_type_id": cable_id,
-                         "rack_id": rack_id,
-                         "created_by": team_lead_id,
-                         "position": position,
-                         "created_at": now_in_timezone,
-                         "status_id": status_id,
-                         "quantity": quantity,
-                         "percent": calculation.percent_calculation(rack_id, act_id, cable_id, position, quantity)
-                         })
-                    else:
-                        continue
-                        #st.warning("Rack and cable type must be select
-                    
-        st.success("✅ Changes saved!")
-        st.rerun()
+            tasks = _save_assignments(conn, changes, team_lead_id, now_in_timezone)
+        # Queued only after the rack states committed, so a failed save writes no tasks either.
+        ack = write_queue.submit(tasks, now_in_timezone)
+
+        # Give the queue a moment so the reloaded grid already shows the new tasks.
+        if ack.wait(ACK_WAIT_SECONDS):
+            st.success("✅ Changes saved!")
+            st.rerun()
+        st.info("✅ Changes queued; the grid will show them shortly.")
     
     st.markdown("---")
     st.subheader("📌 Create task")
 
-    with engine.connect() as conn:
-        racks = conn.execute(text("SELECT id, name, dh FROM racks ORDER BY name")).fetchall()
-        activities = conn.execute(text("SELECT id, name FROM activities ORDER BY name")).fetchall()
-        cable_types = conn.execute(text("SELECT id, name FROM cable_type ORDER BY name")).fetchall()
-        statuses = conn.execute(text("SELECT id, name FROM statuses ORDER BY name")).fetchall()
-
-    rack_options = {f"{r.name} ({r.dh})": r.id for r in racks}
-    activity_options = {a.name: a.id for a in activities}
-    cable_type_options = {c.name: c.id for c in cable_types}
-    status_options = {s.name: s.id for s in statuses}
+    rack_options = reference.racks().name_to_id
+    activity_options = reference.activities().name_to_id
+    cable_type_options = reference.cable_types().name_to_id
+    status_options = reference.statuses().name_to_id
     positions = {"Varies": "varies", "Left": "left", "Right": "right", "Back": "back", "Front": "front"}
 
     with st.form("rack_task_form"):
@@ -275,28 +265,17 @@ def run():
         # else:
         #     percent = 0
         
-        percent = calculation.percent_calculation(rack_id, activity_id, cable_id, position, quantity)
+        percent = float(calculation.percent_calculation_batch([(rack_id, activity_id, cable_id, position, quantity)]).iloc[0])
 
         with engine.begin() as conn:
-            conn.execute(text("""
-                INSERT INTO rack_states (
-                    rack_id, activity_id, cable_type_id, status_id, 
-                    position, quantity, percent, created_by, created_at
-                )
-                VALUES (
-                    :rack_id, :activity_id, :cable_type_id, :status_id,
-                    :position, :quantity, :percent, :created_by, :created_at
-                )
-            """), {
+            rack_state.insert_states(conn, pd.DataFrame([{
                 "rack_id": rack_id,
                 "activity_id": activity_id,
                 "cable_type_id": cable_id,
-                "status_id": status_options[selected_status],
                 "position": position,
+                "status_id": status_options[selected_status],
                 "quantity": quantity,
                 "percent": percent,
-                "created_by": st.session_state.user["id"],
-                "created_at": now_in_timezone
-            })
+            }]), st.session_state.user["id"], now_in_timezone)
 
         st.success(f"✅ Saved. Completion: {percent}%")
@@ -1,8 +1,192 @@
-from sqlalchemy import create_engine
+import threading
+import time
+
+import pandas as pd
+
+from sqlalchemy import create_engine, event, exc, text
+from sqlalchemy.pool import QueuePool
 import streamlit as st
 
-def get_engine():
-    db = st.secrets["database"]
-    return create_engine(
-        f"postgresql+psycopg2://{db.user}:{db.password}@{db.host}:{db.port}/{db.dbname}"
+from utils import query_stats
+
+_engines = {}
+_metrics = {}
+_lock = threading.Lock()
+
+POOL_DEFAULTS = {
+    "pool_size": 5,
+    "max_overflow": 10,
+    "pool_timeout": 30,
+    "pool_recycle": 1800,
+    "pool_pre_ping": True,
+    "statement_timeout": 0,
+}
+
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def incr(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "timeouts": self.timeouts,
+                "wait_total_ms": round(self.wait_total * 1000, 1),
+                "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 2) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 1),
+            }
+
+
+class _TimedQueuePool(QueuePool):
+    # Measures how long callers wait for a free connection when the pool is exhausted.
+    metrics = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record_wait(time.perf_counter() - start)
+        return conn
+
+
+def _pool_settings(db):
+    settings = dict(POOL_DEFAULTS)
+    for key, default in POOL_DEFAULTS.items():
+        if key in db:
+            value = db[key]
+            settings[key] = bool(value) if isinstance(default, bool) else int(value)
+    return settings
+
+
+def _build_engine(db, settings):
+    metrics = PoolMetrics()
+    pool_class = type("TimedQueuePool", (_TimedQueuePool,), {"metrics": metrics})
+
+    connect_args = {}
+    if settings["statement_timeout"]:
+        connect_args["options"] = f"-c statement_timeout={settings['statement_timeout']}"
+
+    engine = create_engine(
+        f"postgresql+psycopg2://{db.user}:{db.password}@{db.host}:{db.port}/{db.dbname}",
+        poolclass=pool_class,
+        pool_size=settings["pool_size"],
+        max_overflow=settings["max_overflow"],
+        pool_timeout=settings["pool_timeout"],
+        pool_recycle=settings["pool_recycle"],
+        pool_pre_ping=settings["pool_pre_ping"],
+        connect_args=connect_args,
     )
+
+    event.listen(engine, "connect", lambda *args: metrics.incr("connects"))
+    event.listen(engine, "checkout", lambda *args: metrics.incr("checkouts"))
+    event.listen(engine, "checkin", lambda *args: metrics.incr("checkins"))
+    query_stats.instrument(engine)
+    return engine, metrics
+
+
+def get_engine(name="database"):
+    engine = _engines.get(name)
+    if engine is not None:
+        return engine
+
+    with _lock:
+        engine = _engines.get(name)
+        if engine is None:
+            db = st.secrets[name]
+            engine, metrics = _build_engine(db, _pool_settings(db))
+            _metrics[name] = metrics
+            _engines[name] = engine
+    return engine
+
+
+def pool_status(name="database"):
+    engine = _engines.get(name)
+    if engine is None:
+        return None
+
+    pool = engine.pool
+    status = {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": pool.overflow(),
+    }
+    status.update(_metrics[name].snapshot())
+    return status
+
+
+def dispose_engines():
+    with _lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+        _metrics.clear()
+
+
+def int_list(values):
+    return [None if pd.isna(v) else int(v) for v in values]
+
+
+def text_list(values):
+    return [None if pd.isna(v) else str(v) for v in values]
+
+
+def bool_list(values):
+    return [None if pd.isna(v) else bool(v) for v in values]
+
+
+LISTS = {
+    "boolean": bool_list,
+    "integer": int_list,
+    "text": text_list,
+}
+
+
+def unnest_params(df, types):
+    # One bound array per column, named v_<column>, for unnest_sql().
+    return {f"v_{column}": LISTS[sql_type](df[column]) for column, sql_type in types.items()}
+
+
+def unnest_sql(types):
+    casts = ", ".join(f"CAST(:v_{column} AS {sql_type}[])" for column, sql_type in types.items())
+    return f"unnest({casts}) AS v({', '.join(types)})"
+
+
+def bulk_upsert(conn, table, df, keys, types):
+    # Inserts or updates every row of df in one INSERT ... ON CONFLICT statement.
+    # keys must match a unique index; types maps each column of df to its SQL type.
+    if df.empty:
+        return 0
+
+    columns = list(types)
+    updates = [c for c in columns if c not in keys]
+    conflict = f"DO UPDATE SET {', '.join(f'{c} = EXCLUDED.{c}' for c in updates)}" if updates else "DO NOTHING"
+    return conn.execute(text(f"""
+        INSERT INTO {table} ({', '.join(columns)})
+        SELECT {', '.join(f'v.{c}' for c in columns)}
+        FROM {unnest_sql(types)}
+        ON CONFLICT ({', '.join(keys)}) {conflict}
+    """), unnest_params(df, types)).rowcount
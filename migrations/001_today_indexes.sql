@@ -0,0 +1,22 @@
+-- Indexes for the "today" queries in survey, teamlead_view and reports.
+-- They filter on half-open [start, end) timestamptz ranges, so plain btree
+-- indexes on the timestamp columns can be used.
+--
+-- Run outside a transaction (CREATE INDEX CONCURRENTLY):
+--   psql "$DATABASE_URL" -f migrations/001_today_indexes.sql
+
+-- Latest task of a technician for a day (survey, Team Lead panel).
+CREATE INDEX CONCURRENTLY IF NOT EXISTS technician_tasks_technician_ts_idx
+    ON technician_tasks (technician_id, timestamp DESC);
+
+-- All tasks of a day (reports).
+CREATE INDEX CONCURRENTLY IF NOT EXISTS technician_tasks_ts_idx
+    ON technician_tasks (timestamp);
+
+-- Latest state per rack / position / activity / cable type.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS rack_states_latest_idx
+    ON rack_states (rack_id, position, activity_id, cable_type_id, created_at DESC);
+
+-- All rack states of a day (daily rack report, PDF report).
+CREATE INDEX CONCURRENTLY IF NOT EXISTS rack_states_created_at_idx
+    ON rack_states (created_at);
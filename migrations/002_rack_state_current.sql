@@ -0,0 +1,25 @@
+-- Latest rack_states row per rack / position / activity / cable type.
+-- Maintained by utils.rack_state.insert_states() in the same statement that
+-- appends to rack_states. After applying, fill it once with:
+--   python -m utils.rack_state backfill
+-- and verify it any time with:
+--   python -m utils.rack_state check
+
+CREATE TABLE IF NOT EXISTS rack_state_current (
+    rack_state_id INTEGER,
+    rack_id INTEGER NOT NULL,
+    position TEXT,
+    activity_id INTEGER,
+    cable_type_id INTEGER,
+    status_id INTEGER,
+    quantity INTEGER,
+    percent NUMERIC,
+    created_by INTEGER,
+    created_at TIMESTAMPTZ
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS rack_state_current_key
+    ON rack_state_current (rack_id, COALESCE(position, ''), COALESCE(activity_id, 0), COALESCE(cable_type_id, 0));
+
+-- Datahall report: racks of one DH.
+CREATE INDEX IF NOT EXISTS racks_dh_idx ON racks (dh, name);
@@ -0,0 +1,29 @@
+-- Latest technician_tasks row per technician.
+-- Maintained by utils.current_task.insert_tasks() in the same statement that
+-- appends to technician_tasks. The INSERT at the end fills it from history;
+-- one day can be rebuilt later with:
+--   python -m utils.current_task --date 2025-07-22 [--reset]
+
+CREATE TABLE IF NOT EXISTS technician_current_task (
+    technician_id INTEGER PRIMARY KEY,
+    task_id INTEGER,
+    location_id INTEGER,
+    activity_id INTEGER,
+    cable_type_id INTEGER,
+    rack_id INTEGER,
+    rack TEXT,
+    source INTEGER,
+    position TEXT,
+    timestamp TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS technician_current_task_ts_idx ON technician_current_task (timestamp);
+
+INSERT INTO technician_current_task (
+    technician_id, task_id, location_id, activity_id, cable_type_id, rack_id, rack, source, position, timestamp
+)
+SELECT DISTINCT ON (technician_id)
+    technician_id, id, location_id, activity_id, cable_type_id, rack_id, rack, source, position, timestamp
+FROM technician_tasks
+ORDER BY technician_id, timestamp DESC, id DESC
+ON CONFLICT (technician_id) DO NOTHING;
@@ -0,0 +1,7 @@
+-- Supports the per-report technician rollups in content/reports.py
+-- (technician names grouped by rack / activity / cable type).
+--
+-- Run outside a transaction (CREATE INDEX CONCURRENTLY).
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS technician_tasks_rack_activity_idx
+    ON technician_tasks (rack_id, activity_id, cable_type_id) INCLUDE (technician_id, timestamp);
@@ -0,0 +1,15 @@
+-- Keys for the bulk rack import in Sources (utils.rack_import).
+-- The import upserts racks with ON CONFLICT (name, dh), which needs a unique
+-- index on those columns. Check for duplicates first; the index build fails
+-- while any remain:
+--   SELECT name, dh, COUNT(*) FROM racks GROUP BY name, dh HAVING COUNT(*) > 1;
+--
+-- Run outside a transaction (CREATE INDEX CONCURRENTLY):
+--   psql "$DATABASE_URL" -f migrations/005_rack_import_keys.sql
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS racks_name_dh_key
+    ON racks (name, dh);
+
+-- Matching imported rows to existing planned quantities.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS rack_results_key_idx
+    ON rack_results (rack_id, activity_id, cable_type_id, position);
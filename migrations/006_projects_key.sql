@@ -0,0 +1,6 @@
+-- Projects are saved with INSERT ... ON CONFLICT (project) (db.bulk_upsert),
+-- which needs a unique index on project. Skip this file when project is
+-- already the primary key.
+--   psql "$DATABASE_URL" -f migrations/006_projects_key.sql
+
+CREATE UNIQUE INDEX IF NOT EXISTS projects_project_key ON projects (project);
@@ -0,0 +1,6 @@
+-- Sign-in and the survey "Check email" look technicians up by LOWER(email).
+-- Run outside a transaction (CREATE INDEX CONCURRENTLY):
+--   psql "$DATABASE_URL" -f migrations/007_technicians_email_index.sql
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS technicians_lower_email_idx
+    ON technicians (LOWER(email));
@@ -1,7 +1,14 @@
 import streamlit as st
 from datetime import datetime, timedelta, timezone
-from content import survey, teamlead_view, settings, reports, sources
-from auth import get_user_by_email, register_user, is_team_lead, is_admin, hash_password, check_password, generate_token, save_token, get_user_by_token
+from content import survey, teamlead_view, settings, reports, sources, performance
+from auth import get_user_by_email, register_user, is_team_lead, is_admin, check_password, generate_token, save_token, get_user_by_token
+from utils import partitions, passwords, profiler, query_stats, reference, report_cache, write_queue
+
+reference.start_listener()
+report_cache.start_worker()
+write_queue.start_worker()
+query_stats.start_exporters()
+partitions.start_worker()
 
 st.set_page_config(page_title="Survey",  page_icon="✅", layout="wide", initial_sidebar_state="expanded")
 hide_streamlit_style = """
@@ -11,6 +18,8 @@ hide_streamlit_style = """
     </style>
 """
 st.markdown(hide_streamlit_style, unsafe_allow_html=True)
+query_stats.set_page("Sign-in")
+profiler.begin()
 
 
 if not st.user.is_logged_in:   
@@ -54,6 +63,7 @@ else:
         st.logout()
         st.session_state.user = None
         # st.rerun()
+profiler.lap("auth")
 
 # if st.user.is_logged_in:
 #     user = get_user_by_email(st.user.email)
@@ -117,7 +127,9 @@ if "user" not in st.session_state:
 # ========== Without authorization ==========
 user = st.session_state.user
 if not user:
-    survey.run()
+    query_stats.set_page("Survey")
+    with profiler.page("Survey"):
+        survey.run()
 
     col1, col2 = st.columns(2)
 
@@ -150,7 +162,6 @@ if not user:
         st.subheader("🔐 Login")
         login_email = st.text_input("Email", key="login_email")
         login_password = st.text_input("Password", type="password", key="login_password")
-        hashed_pw = hash_password(login_password)
         #st.success(hashed_pw)
         #st.success(login_password)
         # st.success(user["password"])
@@ -158,7 +169,12 @@ if not user:
         if st.button("Login now"):
             user = get_user_by_email(login_email)
             # if user and user["password"] == login_password: 
-            if user and check_password(login_password, user["password"]):
+            try:
+                valid = bool(user) and check_password(login_password, user["password"])
+            except passwords.Busy:
+                st.error("Too many sign-ins right now, please try again in a moment.")
+                st.stop()
+            if valid:
                 st.session_state.user = user
                 st.success("Logged in successfully!")
                 st.rerun()
@@ -173,7 +189,11 @@ if not user:
         reg_password = st.text_input("Password", type="password", key="reg_password")
 
         if st.button("Create account"):
-            success = register_user(reg_name, reg_email, reg_password)
+            try:
+                success = register_user(reg_name, reg_email, reg_password)
+            except passwords.Busy:
+                st.error("Too many sign-ins right now, please try again in a moment.")
+                st.stop()
             if success:
                 st.success("Registered successfully! Now log in.")
                 st.session_state.show_register = False
@@ -191,20 +211,25 @@ else:
         options.append("Settings")
         options.append("Reports")
         options.append("Sources")
+        options.append("Performance")
     # options.append("Logout")
 
     page = st.sidebar.radio("Navigation", options)
-
-    if page == "Survey":
-        survey.run()
-    elif page == "Team Lead":
-        teamlead_view.run()
-    elif page == "Settings":
-        settings.run()
-    elif page == "Reports":
-        reports.run() 
-    elif page == "Sources":
-        sources.run()
+    query_stats.set_page(page)
+
+    with profiler.page(page):
+        if page == "Survey":
+            survey.run()
+        elif page == "Team Lead":
+            teamlead_view.run()
+        elif page == "Settings":
+            settings.run()
+        elif page == "Reports":
+            reports.run() 
+        elif page == "Sources":
+            sources.run()
+        elif page == "Performance":
+            performance.run()
     # elif page == "Logout":
     #     st.session_state.user = None
     #     st.success("Logged out.")
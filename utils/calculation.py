@@ -1,23 +1,121 @@
+import threading
+
+import numpy as np
+import pandas as pd
 from db import get_engine
 from sqlalchemy import text
+from utils import reference
+
+KEY_COLUMNS = ["rack_id", "activity_id", "cable_type_id", "position"]
+
+_plan_cache = {}
+_plan_cache_version = 0
+_plan_cache_lock = threading.Lock()
+
+
+def _forget_plans():
+    global _plan_cache_version
+    with _plan_cache_lock:
+        _plan_cache.clear()
+        _plan_cache_version += 1
+
+
+def _on_reference_invalidate(tables):
+    if "rack_results" in tables:
+        _forget_plans()
+
+
+reference.subscribe(_on_reference_invalidate)
+
+
+def invalidate_plan_cache():
+    # Call after the rack_results change is committed; other processes clear theirs on the NOTIFY.
+    reference.invalidate("rack_results")
+
+
+def _fetch_planned(conn, keys):
+    rows = conn.execute(text("""
+        SELECT v.rack_id, v.activity_id, v.cable_type_id, v.position, rr.quantity
+        FROM unnest(
+            CAST(:rack_ids AS integer[]),
+            CAST(:activity_ids AS integer[]),
+            CAST(:cable_type_ids AS integer[]),
+            CAST(:positions AS text[])
+        ) AS v(rack_id, activity_id, cable_type_id, position)
+        LEFT JOIN LATERAL (
+            SELECT quantity FROM rack_results
+            WHERE rack_id = v.rack_id AND activity_id = v.activity_id
+              AND cable_type_id = v.cable_type_id AND position = v.position
+            LIMIT 1
+        ) rr ON true
+    """), {
+        "rack_ids": [k[0] for k in keys],
+        "activity_ids": [k[1] for k in keys],
+        "cable_type_ids": [k[2] for k in keys],
+        "positions": [k[3] for k in keys],
+    }).fetchall()
+    return {(r.rack_id, r.activity_id, r.cable_type_id, r.position): r.quantity for r in rows}
 
-def percent_calculation(rack_id, activity_id, cable_id, position, quantity):
 
-    engine = get_engine()
+def planned_quantities(keys, conn=None, use_cache=True):
+    keys = set(keys)
+    found = {}
+    with _plan_cache_lock:
+        version = _plan_cache_version
+        if use_cache:
+            found = {k: _plan_cache[k] for k in keys if k in _plan_cache}
 
-    with engine.connect() as conn:
-        planned = conn.execute(text("""
-            SELECT quantity FROM rack_results 
-            WHERE rack_id = :rack_id AND activity_id = :activity_id 
-                AND cable_type_id = :cable_type_id AND position = :position
-            """), {
-                "rack_id": rack_id,
-                "activity_id": activity_id,
-                "cable_type_id": cable_id,
-                "position": position
-            }).scalar()
+    missing = [k for k in keys if k not in found and None not in k]
+    if missing:
+        if conn is None:
+            with get_engine().connect() as own_conn:
+                fetched = _fetch_planned(own_conn, missing)
+        else:
+            fetched = _fetch_planned(conn, missing)
 
-        if planned and planned > 0:
-            return round(quantity / planned * 100, 1)
+        found.update(fetched)
+        if use_cache:
+            with _plan_cache_lock:
+                # Misses are not cached: a planned quantity can be added at any time.
+                # Skip storing if an invalidation arrived while we were loading.
+                if _plan_cache_version == version:
+                    _plan_cache.update({k: v for k, v in fetched.items() if v is not None})
 
-        return 0
\ No newline at end of file
+    return found
+
+
+def _normalize_key(rack_id, activity_id, cable_id, position):
+    def as_int(value):
+        return None if pd.isna(value) else int(value)
+
+    return (
+        as_int(rack_id),
+        as_int(activity_id),
+        as_int(cable_id),
+        None if pd.isna(position) else str(position),
+    )
+
+
+def percent_calculation_batch(items, conn=None, use_cache=True):
+    if isinstance(items, pd.DataFrame):
+        frame = items[KEY_COLUMNS + ["quantity"]]
+    else:
+        frame = pd.DataFrame(list(items), columns=KEY_COLUMNS + ["quantity"])
+
+    if frame.empty:
+        return pd.Series([], index=frame.index, dtype=float)
+
+    keys = [_normalize_key(*row) for row in frame[KEY_COLUMNS].itertuples(index=False, name=None)]
+    planned_map = planned_quantities(keys, conn=conn, use_cache=use_cache)
+
+    planned = np.array([planned_map.get(k) or 0 for k in keys], dtype=float)
+    quantity = pd.to_numeric(frame["quantity"], errors="coerce").fillna(0).to_numpy(dtype=float)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percent = np.where(planned > 0, np.round(quantity / planned * 100, 1), 0.0)
+
+    return pd.Series(percent, index=frame.index)
+
+
+def percent_calculation(rack_id, activity_id, cable_id, position, quantity):
+    return float(percent_calculation_batch([(rack_id, activity_id, cable_id, position, quantity)]).iloc[0])
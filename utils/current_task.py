@@ -0,0 +1,121 @@
+import argparse
+from datetime import date, datetime, timezone
+from zoneinfo import ZoneInfo
+
+from db import get_engine, int_list, text_list
+from sqlalchemy import text
+from utils import dates
+
+TASK_COLUMNS = "technician_id, location_id, activity_id, cable_type_id, rack_id, rack, source, position, timestamp"
+
+UPSERT_CURRENT_SQL = f"""
+    INSERT INTO technician_current_task (task_id, {TASK_COLUMNS})
+    SELECT DISTINCT ON (technician_id) id, {TASK_COLUMNS}
+    FROM inserted
+    ORDER BY technician_id, timestamp DESC, id DESC
+    ON CONFLICT (technician_id) DO UPDATE SET
+        task_id = EXCLUDED.task_id,
+        location_id = EXCLUDED.location_id,
+        activity_id = EXCLUDED.activity_id,
+        cable_type_id = EXCLUDED.cable_type_id,
+        rack_id = EXCLUDED.rack_id,
+        rack = EXCLUDED.rack,
+        source = EXCLUDED.source,
+        position = EXCLUDED.position,
+        timestamp = EXCLUDED.timestamp
+    WHERE technician_current_task.timestamp <= EXCLUDED.timestamp
+"""
+
+CURRENT_SQL = f"""
+    SELECT task_id, {TASK_COLUMNS}
+    FROM technician_current_task
+    WHERE timestamp >= :start AND timestamp < :end
+"""
+
+HISTORY_SQL = f"""
+    SELECT DISTINCT ON (technician_id) id AS task_id, {TASK_COLUMNS}
+    FROM technician_tasks
+    WHERE timestamp >= :start AND timestamp < :end
+    ORDER BY technician_id, timestamp DESC, id DESC
+"""
+
+
+def insert_tasks(conn, tasks, timestamp=None):
+    # Appends to technician_tasks and moves technician_current_task forward, in one statement.
+    # Rows carry their own "timestamp" column when they were queued at different times.
+    if tasks.empty:
+        return
+
+    conn.execute(text(f"""
+        WITH inserted AS (
+            INSERT INTO technician_tasks (
+                technician_id, location_id, activity_id, cable_type_id, rack_id, source, position, timestamp
+            )
+            SELECT v.technician_id, v.location_id, v.activity_id, v.cable_type_id, v.rack_id,
+                   v.source, v.position, v.timestamp
+            FROM unnest(
+                CAST(:technician_ids AS integer[]),
+                CAST(:location_ids AS integer[]),
+                CAST(:activity_ids AS integer[]),
+                CAST(:cable_type_ids AS integer[]),
+                CAST(:rack_ids AS integer[]),
+                CAST(:sources AS integer[]),
+                CAST(:positions AS text[]),
+                CAST(:timestamps AS timestamptz[])
+            ) AS v(technician_id, location_id, activity_id, cable_type_id, rack_id, source, position, timestamp)
+            RETURNING *
+        )
+        {UPSERT_CURRENT_SQL}
+    """), {
+        "technician_ids": int_list(tasks["technician_id"]),
+        "location_ids": int_list(tasks["location_id"]),
+        "activity_ids": int_list(tasks["activity_id"]),
+        "cable_type_ids": int_list(tasks["cable_type_id"]),
+        "rack_ids": int_list(tasks["rack_id"]),
+        "sources": int_list(tasks["source"]),
+        "positions": text_list(tasks["position"]) if "position" in tasks else [None] * len(tasks),
+        "timestamps": list(tasks["timestamp"]) if "timestamp" in tasks else [timestamp] * len(tasks),
+    })
+
+
+def latest_tasks_sql(start, end):
+    # The projection only knows each technician's newest task, so it answers
+    # "latest task in [start, end)" only while the range reaches the present.
+    if end > datetime.now(timezone.utc):
+        return CURRENT_SQL
+    return HISTORY_SQL
+
+
+def rebuild(conn, start, end, reset=False):
+    if reset:
+        conn.execute(text("""
+            DELETE FROM technician_current_task WHERE timestamp >= :start AND timestamp < :end
+        """), {"start": start, "end": end})
+
+    result = conn.execute(text(f"""
+        WITH inserted AS (
+            SELECT id, {TASK_COLUMNS}
+            FROM technician_tasks
+            WHERE timestamp >= :start AND timestamp < :end
+        )
+        {UPSERT_CURRENT_SQL}
+    """), {"start": start, "end": end})
+    return result.rowcount
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild technician_current_task from technician_tasks.")
+    parser.add_argument("--date", type=date.fromisoformat, default=None, help="day to rebuild, default today")
+    parser.add_argument("--timezone", default=dates.DEFAULT_TIMEZONE)
+    parser.add_argument("--reset", action="store_true", help="drop the day's projected rows first")
+    args = parser.parse_args()
+
+    tz = ZoneInfo(args.timezone)
+    start, end = dates.day_bounds(args.date or dates.today(tz), tz)
+    with get_engine().begin() as conn:
+        count = rebuild(conn, start, end, reset=args.reset)
+    print(f"technician_current_task: {count} technicians updated from {start:%Y-%m-%d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import threading
+import time as clock
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from db import get_engine
+from sqlalchemy import text
+from utils import reference
+
+DEFAULT_TIMEZONE = "America/Chicago"
+PROJECT_ZONE_TTL = 300
+
+_project_zones = {}
+_lock = threading.Lock()
+
+
+def zone(name):
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError, TypeError):
+        return ZoneInfo(DEFAULT_TIMEZONE)
+
+
+def is_valid_zone(name):
+    try:
+        ZoneInfo(name)
+        return True
+    except (ZoneInfoNotFoundError, ValueError, TypeError):
+        return False
+
+
+def project_timezone(user=None):
+    project = (user or {}).get("project")
+    if not project:
+        return ZoneInfo(DEFAULT_TIMEZONE)
+
+    with _lock:
+        entry = _project_zones.get(project)
+    if entry and clock.monotonic() - entry[1] < PROJECT_ZONE_TTL:
+        return entry[0]
+
+    with get_engine().connect() as conn:
+        tz_name = conn.execute(
+            text("SELECT time_zone FROM projects WHERE project = :project"),
+            {"project": project}
+        ).scalar()
+
+    tz = zone(tz_name) if tz_name else ZoneInfo(DEFAULT_TIMEZONE)
+    with _lock:
+        _project_zones[project] = (tz, clock.monotonic())
+    return tz
+
+
+def forget_project_timezones():
+    # Local only; reference.invalidate("projects") also reaches the other app processes.
+    with _lock:
+        _project_zones.clear()
+
+
+def _on_reference_invalidate(tables):
+    if "projects" in tables:
+        forget_project_timezones()
+
+
+reference.subscribe(_on_reference_invalidate)
+
+
+def today(tz):
+    return datetime.now(tz).date()
+
+
+def day_bounds(day, tz):
+    # Half-open [start, end) so "timestamp >= :start AND timestamp < :end" can use an index.
+    start = datetime.combine(day, time.min, tzinfo=tz)
+    end = datetime.combine(day + timedelta(days=1), time.min, tzinfo=tz)
+    return start, end
@@ -0,0 +1,31 @@
+import streamlit as st
+
+
+class FilterSpec:
+    # Maps filter names to the SQL expressions they restrict, e.g. {"location": "loc.id"},
+    # and compiles the selected values into parameterized "= ANY(...)" clauses.
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.selected = {}
+
+    def set(self, name, values):
+        if name not in self.columns:
+            raise KeyError(name)
+        if values:
+            self.selected[name] = list(values)
+        else:
+            self.selected.pop(name, None)
+
+    def sql(self):
+        return "".join(f" AND {self.columns[name]} = ANY(:filter_{name})" for name in self.selected)
+
+    def params(self):
+        return {f"filter_{name}": values for name, values in self.selected.items()}
+
+
+def multiselect(spec, name, label, lookup, key):
+    # Offers ids from a reference lookup and shows their names.
+    selected = st.multiselect(label, list(lookup.id_to_name), format_func=lookup.id_to_name.get, key=key)
+    spec.set(name, selected)
+    return selected
@@ -0,0 +1,371 @@
+import argparse
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+from db import get_engine
+from sqlalchemy import text
+from utils import dates
+
+# Monthly range partitions for the append-only history tables. Months start at
+# local midnight on the 1st in [partitions] timezone, so a "today" range in that
+# zone always falls into one partition. Each table also has a DEFAULT partition
+# for rows outside the created months; ensure() moves them out when their month
+# is created.
+#
+# Partitioning requires the partition column in every unique key: the primary
+# key becomes (id, <column>) and the column NOT NULL. ids still come from the
+# same sequence, so technician_current_task.task_id and
+# rack_state_current.rack_state_id stay valid, but nothing can reference id on
+# its own with a foreign key any more.
+
+TABLES = {
+    "technician_tasks": "timestamp",
+    "rack_states": "created_at",
+}
+
+ARROW_TYPES = {
+    "smallint": pa.int16(),
+    "integer": pa.int32(),
+    "bigint": pa.int64(),
+    "boolean": pa.bool_(),
+    "numeric": pa.float64(),
+    "real": pa.float32(),
+    "double precision": pa.float64(),
+    "date": pa.date32(),
+    "timestamp with time zone": pa.timestamp("us", tz="UTC"),
+    "timestamp without time zone": pa.timestamp("us"),
+}
+
+EXPORT_CHUNK_ROWS = 100_000
+
+# Every app process runs ensure(); partition DDL is serialised on this key.
+ADVISORY_LOCK_KEY = 0x64617461
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_worker = None
+
+
+def _settings():
+    partitions = st.secrets.get("partitions", {})
+    return {
+        "timezone": dates.zone(partitions.get("timezone", dates.DEFAULT_TIMEZONE)),
+        "months_ahead": int(partitions.get("months_ahead", 3)),
+        # 0 keeps every month in the database.
+        "retain_months": int(partitions.get("retain_months", 0)),
+        "archive_dir": Path(partitions.get("archive_dir", Path(__file__).resolve().parent.parent / ".archive")),
+        "compression": partitions.get("compression", "zstd"),
+        "interval": int(partitions.get("check_interval", 6 * 3600)),
+    }
+
+
+def next_month(month):
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1, day=1)
+
+
+def month_bounds(month, tz):
+    start, _ = dates.day_bounds(month.replace(day=1), tz)
+    end, _ = dates.day_bounds(next_month(month), tz)
+    return start, end
+
+
+def partition_name(table, month):
+    return f"{table}_p{month:%Y_%m}"
+
+
+def _month(table, name):
+    prefix = f"{table}_p"
+    if not name.startswith(prefix):
+        return None
+    try:
+        return datetime.strptime(name[len(prefix):], "%Y_%m").date()
+    except ValueError:
+        return None
+
+
+def is_partitioned(conn, table):
+    return conn.execute(text("""
+        SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))
+    """), {"table": table}).scalar()
+
+
+def partitions(conn, table):
+    # Attached monthly partitions as {first day of month: name}.
+    names = conn.execute(text("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:table)
+    """), {"table": table}).scalars().all()
+    return {month: name for name in names if (month := _month(table, name))}
+
+
+def detached(conn, table):
+    # Monthly tables that were detached but not archived yet (an interrupted archive()).
+    names = conn.execute(text("""
+        SELECT relname FROM pg_class
+        WHERE relkind = 'r' AND NOT relispartition AND relnamespace = CAST(current_schema() AS regnamespace)
+    """)).scalars().all()
+    return {month: name for name in names if (month := _month(table, name))}
+
+
+def create_partition(conn, table, month, tz):
+    # Built as a plain table and attached, so rows already sitting in the
+    # DEFAULT partition for that month can be moved in first.
+    column = TABLES[table]
+    name = partition_name(table, month)
+    start, end = month_bounds(month, tz)
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    moved = conn.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {table}_default
+            WHERE "{column}" >= :start AND "{column}" < :end
+            RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved
+    """), {"start": start, "end": end}).rowcount
+    conn.execute(text(f"""
+        ALTER TABLE {table} ATTACH PARTITION {name}
+        FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')
+    """))
+    return name, moved
+
+
+def _lock_partitions(conn):
+    # Held until conn's transaction ends.
+    conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+
+
+def ensure(conn, table, tz, months_ahead, since=None):
+    # Creates the missing months from since (default: the current month) through months_ahead.
+    if not is_partitioned(conn, table):
+        return []
+    _lock_partitions(conn)
+    existing = partitions(conn, table)
+    current = dates.today(tz).replace(day=1)
+    month = min(since.replace(day=1), current) if since else current
+    created = []
+    while month <= add_months(current, months_ahead):
+        if month not in existing:
+            created.append(create_partition(conn, table, month, tz))
+        month = next_month(month)
+    return created
+
+
+def migrate(conn, table, tz, months_ahead):
+    # Swaps the table for a partitioned one holding the same rows, indexes and
+    # foreign keys. The old table stays as <table>_unpartitioned until dropped by hand.
+    column = TABLES[table]
+    _lock_partitions(conn)
+    if is_partitioned(conn, table):
+        return None
+    old = f"{table}_unpartitioned"
+
+    conn.execute(text(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE"))
+    missing = conn.execute(text(f'SELECT COUNT(*) FROM {table} WHERE "{column}" IS NULL')).scalar()
+    if missing:
+        raise ValueError(f"{table}: {missing} rows without {column}; set it before partitioning")
+
+    indexes = conn.execute(text("""
+        SELECT i.relname AS name, pg_get_indexdef(x.indexrelid) AS definition,
+               x.indisunique AS is_unique, x.indisprimary AS is_primary
+        FROM pg_index x
+        JOIN pg_class i ON i.oid = x.indexrelid
+        WHERE x.indrelid = to_regclass(:table)
+    """), {"table": table}).fetchall()
+    foreign_keys = conn.execute(text("""
+        SELECT conname AS name, pg_get_constraintdef(oid) AS definition
+        FROM pg_constraint
+        WHERE conrelid = to_regclass(:table) AND contype = 'f'
+    """), {"table": table}).fetchall()
+    sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": table}).scalar()
+    first = conn.execute(text(f'SELECT MIN("{column}") FROM {table}')).scalar()
+
+    conn.execute(text(f"ALTER TABLE {table} RENAME TO {old}"))
+    for index in indexes:
+        conn.execute(text(f"ALTER INDEX {index.name} RENAME TO {index.name[:49]}_unpartitioned"))
+
+    conn.execute(text(f"""
+        CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+        PARTITION BY RANGE ("{column}")
+    """))
+    conn.execute(text(f'ALTER TABLE {table} ADD PRIMARY KEY (id, "{column}")'))
+    if sequence:
+        # Otherwise dropping the old table would take the id sequence with it.
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id"))
+    conn.execute(text(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT"))
+    if first is not None and first.tzinfo is None:
+        # A timestamp without time zone column; read its values as UTC.
+        first = first.replace(tzinfo=timezone.utc)
+    since = first.astimezone(tz).date() if first else None
+    ensure(conn, table, tz, months_ahead, since=since)
+
+    rows = conn.execute(text(f"INSERT INTO {table} SELECT * FROM {old}")).rowcount
+
+    # Indexes are built after the copy; definitions still name the original table.
+    for index in indexes:
+        if not index.is_unique:
+            conn.execute(text(index.definition))
+    for key in foreign_keys:
+        conn.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {key.name} {key.definition}"))
+    conn.execute(text(f"ANALYZE {table}"))
+    return {
+        "rows": rows,
+        # A unique key without the partition column cannot exist on a partitioned table.
+        "unique_indexes_dropped": [index.name for index in indexes if index.is_unique and not index.is_primary],
+    }
+
+
+def _arrow_schema(conn, name):
+    columns = conn.execute(text("""
+        SELECT column_name, data_type
+        FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = :name
+        ORDER BY ordinal_position
+    """), {"name": name}).fetchall()
+    return pa.schema([(c.column_name, ARROW_TYPES.get(c.data_type, pa.string())) for c in columns])
+
+
+def export(conn, name, path, compression):
+    # Writes one detached month to Parquet through a temporary file and
+    # returns the row count, checked against the table before the file is kept.
+    schema = _arrow_schema(conn, name)
+    expected = conn.execute(text(f"SELECT COUNT(*) FROM {name}")).scalar()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+
+    with pq.ParquetWriter(tmp, schema, compression=compression) as writer:
+        chunks = pd.read_sql(
+            text(f"SELECT * FROM {name} ORDER BY id"),
+            conn.execution_options(stream_results=True),
+            chunksize=EXPORT_CHUNK_ROWS,
+        )
+        for chunk in chunks:
+            for field in schema:
+                if field.type == pa.string():
+                    chunk[field.name] = chunk[field.name].map(lambda v: None if pd.isna(v) else str(v))
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+    written = pq.ParquetFile(tmp).metadata.num_rows
+    if written != expected:
+        tmp.unlink(missing_ok=True)
+        raise RuntimeError(f"{name}: wrote {written} of {expected} rows to Parquet")
+    os.replace(tmp, path)
+    return written
+
+
+def archive(engine, table, settings, keep=False):
+    # Detaches the months older than retain_months, exports each to
+    # <archive_dir>/<table>/<partition>.parquet and drops it (unless keep).
+    tz = settings["timezone"]
+    cutoff = add_months(dates.today(tz).replace(day=1), -settings["retain_months"])
+
+    with engine.begin() as conn:
+        if not is_partitioned(conn, table):
+            return []
+        _lock_partitions(conn)
+        for month, name in sorted(partitions(conn, table).items()):
+            if month < cutoff:
+                # Not CONCURRENTLY: that is refused while a DEFAULT partition exists.
+                conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+
+    with engine.connect() as conn:
+        pending = sorted(detached(conn, table).items())
+
+    archived = []
+    for month, name in pending:
+        path = settings["archive_dir"] / table / f"{name}.parquet"
+        if path.exists():
+            # Exported by an earlier run (kept, or interrupted before the drop).
+            rows = pq.ParquetFile(path).metadata.num_rows
+        else:
+            with engine.connect() as conn:
+                rows = export(conn, name, path, settings["compression"])
+        if not keep:
+            with engine.begin() as conn:
+                conn.execute(text(f"DROP TABLE {name}"))
+        archived.append((name, rows, path))
+    return archived
+
+
+def _run_worker(settings):
+    while True:
+        try:
+            with get_engine().begin() as conn:
+                for table in TABLES:
+                    for name, moved in ensure(conn, table, settings["timezone"], settings["months_ahead"]):
+                        logger.info("Created partition %s (%s rows moved from %s_default)", name, moved, table)
+        except Exception:
+            logger.exception("Partition maintenance failed")
+        time.sleep(settings["interval"])
+
+
+def start_worker():
+    global _worker
+    with _lock:
+        if _worker is None:
+            _worker = threading.Thread(
+                target=_run_worker, args=(_settings(),), name="partition-maintenance", daemon=True
+            )
+            _worker.start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monthly partitions of technician_tasks and rack_states.")
+    parser.add_argument("command", choices=["migrate", "ensure", "archive"])
+    parser.add_argument("--table", choices=list(TABLES), action="append", help="default: both tables")
+    parser.add_argument("--months-ahead", type=int, default=None)
+    parser.add_argument("--retain-months", type=int, default=None, help="archive months older than this")
+    parser.add_argument("--keep", action="store_true", help="keep archived months as detached tables")
+    args = parser.parse_args()
+
+    settings = _settings()
+    if args.months_ahead is not None:
+        settings["months_ahead"] = args.months_ahead
+    if args.retain_months is not None:
+        settings["retain_months"] = args.retain_months
+    tz = settings["timezone"]
+    engine = get_engine()
+
+    for table in args.table or TABLES:
+        if args.command == "migrate":
+            with engine.begin() as conn:
+                result = migrate(conn, table, tz, settings["months_ahead"])
+            if result is None:
+                print(f"{table}: already partitioned")
+                continue
+            print(f"{table}: {result['rows']} rows copied; check them, then DROP TABLE {table}_unpartitioned")
+            for name in result["unique_indexes_dropped"]:
+                print(f"{table}: unique index {name} was not recreated")
+        elif args.command == "ensure":
+            with engine.begin() as conn:
+                if not is_partitioned(conn, table):
+                    raise SystemExit(f"{table} is not partitioned; run migrate first")
+                created = ensure(conn, table, tz, settings["months_ahead"])
+            for name, moved in created:
+                print(f"{table}: created {name} ({moved} rows moved from {table}_default)")
+            if not created:
+                print(f"{table}: partitions exist through {settings['months_ahead']} months ahead")
+        else:
+            if settings["retain_months"] <= 0:
+                raise SystemExit("Set [partitions] retain_months or --retain-months to archive")
+            for name, rows, path in archive(engine, table, settings, keep=args.keep):
+                print(f"{table}: archived {name} ({rows} rows) to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+import streamlit as st
+
+# bcrypt runs in a small pool of worker processes so it neither blocks the
+# session threads nor holds the GIL; a semaphore caps the calls in flight.
+
+DEFAULT_ROUNDS = 12
+
+
+class Busy(Exception):
+    pass
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+def _check(password, hashed):
+    return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+
+
+class PasswordPool:
+    def __init__(self, workers, max_pending, rounds=DEFAULT_ROUNDS, wait_seconds=10):
+        self.workers = workers
+        self.rounds = rounds
+        self.wait_seconds = wait_seconds
+        self._slots = threading.BoundedSemaphore(max_pending)
+        # "spawn": forking a process that already runs Streamlit's threads is not safe.
+        self._executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.wait_seconds):
+            raise Busy("Too many password checks in progress")
+        try:
+            return self._executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(_hash, password, self.rounds)
+
+    def check(self, password, hashed):
+        if not password or not hashed:
+            return False
+        return self._run(_check, password, hashed)
+
+    def shutdown(self):
+        self._executor.shutdown()
+
+
+_pool = None
+_lock = threading.Lock()
+
+
+def _settings():
+    passwords = st.secrets.get("passwords", {})
+    workers = int(passwords.get("workers", min(2, os.cpu_count() or 1)))
+    return {
+        "workers": workers,
+        "max_pending": int(passwords.get("max_pending", workers * 4)),
+        "rounds": int(passwords.get("bcrypt_rounds", DEFAULT_ROUNDS)),
+        "wait_seconds": float(passwords.get("wait_seconds", 10)),
+    }
+
+
+def get_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = PasswordPool(**_settings())
+    return _pool
+
+
+def hash_password(password):
+    return get_pool().hash(password)
+
+
+def check_password(password, hashed):
+    return get_pool().check(password, hashed)
@@ -0,0 +1,73 @@
+from io import BytesIO
+from itertools import groupby
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+from sqlalchemy import text
+
+# Every DH / status / activity / cable type rollup of the day in one grouped query.
+DAILY_SUMMARY_SQL = """
+    SELECT r.dh,
+           s.name AS status,
+           a.name AS activity,
+           ct.name AS cable_type,
+           COUNT(DISTINCT rs.rack_id) AS rack_count
+    FROM rack_states rs
+    JOIN racks r ON rs.rack_id = r.id
+    LEFT JOIN statuses s ON rs.status_id = s.id
+    LEFT JOIN activities a ON rs.activity_id = a.id
+    LEFT JOIN cable_type ct ON rs.cable_type_id = ct.id
+    WHERE rs.created_at >= :start AND rs.created_at < :end
+    GROUP BY r.dh, s.name, a.name, ct.name
+    ORDER BY r.dh NULLS LAST, s.name NULLS LAST, a.name, ct.name
+"""
+
+TABLE_STYLE = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+    ("ALIGN", (2, 1), (2, -1), "RIGHT"),
+    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+])
+
+
+def fetch_daily_summary(conn, start, end):
+    return conn.execute(text(DAILY_SUMMARY_SQL), {"start": start, "end": end}).fetchall()
+
+
+def _story(rows, day, styles):
+    yield Paragraph(f"<b>📅 Report for: {day.strftime('%Y-%m-%d')}</b>", styles["Title"])
+    yield Spacer(1, 12)
+
+    for dh, dh_rows in groupby(rows, key=lambda row: row.dh):
+        yield Paragraph(f"<b>📌 Datahall: {dh}</b>", styles["Heading2"])
+
+        for status, status_rows in groupby(dh_rows, key=lambda row: row.status):
+            if status is None:
+                continue
+            yield Paragraph(f"<b>Status: {status}</b>", styles["Heading3"])
+
+            data = [[row.activity, row.cable_type, row.rack_count]
+                    for row in status_rows if row.activity is not None and row.cable_type is not None]
+            if data:
+                table = Table([["Activity", "Cable", "Racks"]] + data, colWidths=[200, 160, 60], repeatRows=1, hAlign="LEFT")
+                table.setStyle(TABLE_STYLE)
+                yield table
+            else:
+                yield Paragraph("No data for this status.", styles["Italic"])
+
+            yield Spacer(1, 6)
+        yield Spacer(1, 12)
+
+
+def render_daily_report(rows, day):
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    doc.build(list(_story(rows, day, getSampleStyleSheet())))
+    return buffer.getvalue()
+
+
+def daily_report(conn, start, end, day):
+    return render_daily_report(fetch_daily_summary(conn, start, end), day)
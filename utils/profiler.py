@@ -0,0 +1,149 @@
+import contextlib
+import contextvars
+import cProfile
+import json
+import os
+import random
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import streamlit as st
+
+# Per-rerun page timings. begin() starts a rerun, lap(name) charges the time
+# since the previous lap to phase name, and page() wraps the page dispatch and
+# writes the record out; whatever was not lapped is counted as "render".
+# Off unless DATAHALL_PROFILE=1 or [profiler] enabled = true; then every call
+# is a context-variable lookup and nothing more.
+
+_current = contextvars.ContextVar("profiler_rerun", default=None)
+_config = None
+_lock = threading.Lock()
+_tracing = 0
+
+
+def _settings():
+    global _config
+    if _config is None:
+        profiler = st.secrets.get("profiler", {})
+        env = os.environ.get("DATAHALL_PROFILE")
+        _config = {
+            "enabled": env == "1" if env is not None else bool(profiler.get("enabled", False)),
+            "sample_rate": float(os.environ.get("DATAHALL_PROFILE_SAMPLE", profiler.get("sample_rate", 0.05))),
+            "tracemalloc": bool(profiler.get("tracemalloc", False)),
+            "output_dir": Path(profiler.get("output_dir", Path(__file__).resolve().parent.parent / ".profiles")),
+        }
+    return _config
+
+
+class Rerun:
+    def __init__(self, sampled, trace_memory):
+        self.started = time.perf_counter()
+        self.last = self.started
+        self.phases = {}
+        self.page = None
+        self.profile = None
+        self.memory = None
+        if sampled:
+            self.profile = cProfile.Profile()
+            try:
+                self.profile.enable()
+            except ValueError:
+                # Another session's sampled rerun holds the profiler.
+                self.profile = None
+            if trace_memory:
+                self.memory = _start_tracing()
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self.phases[name] = self.phases.get(name, 0.0) + (now - self.last) * 1000
+        self.last = now
+
+    def stop(self):
+        if self.profile is not None:
+            self.profile.disable()
+        memory = None
+        if self.memory is not None:
+            memory = tracemalloc.take_snapshot().compare_to(self.memory, "lineno")
+            _stop_tracing()
+        return memory
+
+
+def _start_tracing():
+    global _tracing
+    with _lock:
+        if _tracing == 0:
+            tracemalloc.start()
+        _tracing += 1
+    return tracemalloc.take_snapshot()
+
+
+def _stop_tracing():
+    global _tracing
+    with _lock:
+        _tracing -= 1
+        if _tracing == 0:
+            tracemalloc.stop()
+
+
+def begin():
+    settings = _settings()
+    if not settings["enabled"]:
+        return
+    previous = _current.get()
+    if previous is not None:
+        previous.stop()
+    sampled = random.random() < settings["sample_rate"]
+    _current.set(Rerun(sampled, settings["tracemalloc"]))
+
+
+def lap(name):
+    rerun = _current.get()
+    if rerun is not None:
+        rerun.lap(name)
+
+
+@contextlib.contextmanager
+def _page(name):
+    rerun = _current.get()
+    rerun.page = name
+    rerun.lap("setup")
+    try:
+        yield
+    finally:
+        # Also runs for st.rerun() / st.stop(), which leave the page by raising.
+        _current.set(None)
+        rerun.lap("render")
+        _persist(rerun, rerun.stop())
+
+
+def page(name):
+    if _current.get() is None:
+        return contextlib.nullcontext()
+    return _page(name)
+
+
+def _persist(rerun, memory):
+    output_dir = _settings()["output_dir"]
+    output_dir.mkdir(parents=True, exist_ok=True)
+    at = datetime.now(timezone.utc)
+    stem = f"{at:%Y%m%dT%H%M%S%f}_{''.join(ch if ch.isalnum() else '_' for ch in rerun.page or 'page')}"
+
+    record = {
+        "at": at.isoformat(timespec="milliseconds"),
+        "page": rerun.page,
+        "total_ms": round((rerun.last - rerun.started) * 1000, 2),
+        "phases": {name: round(ms, 2) for name, ms in rerun.phases.items()},
+    }
+    if rerun.profile is not None:
+        rerun.profile.dump_stats(output_dir / f"{stem}.prof")
+        record["profile"] = f"{stem}.prof"
+    if memory is not None:
+        (output_dir / f"{stem}.mem.txt").write_text("\n".join(str(stat) for stat in memory[:50]) + "\n")
+        record["memory"] = f"{stem}.mem.txt"
+
+    with _lock:
+        with open(output_dir / "reruns.jsonl", "a") as f:
+            f.write(json.dumps(record) + "\n")
@@ -0,0 +1,236 @@
+import contextvars
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import streamlit as st
+from sqlalchemy import event
+
+# Times every statement sent through an instrumented engine. Statements are
+# grouped by fingerprint (literals and whitespace normalized) and attributed
+# to the page that was rendering when they ran.
+
+logger = logging.getLogger(__name__)
+
+BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+_page = contextvars.ContextVar("query_page", default="background")
+_lock = threading.Lock()
+_recent = deque(maxlen=5000)
+_stats = {}
+_workers = {}
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SPACES = re.compile(r"\s+")
+
+
+def _settings():
+    stats = st.secrets.get("query_stats", {})
+    return {
+        "ring_size": int(stats.get("ring_size", 5000)),
+        "export_path": stats.get("export_path", ""),
+        "export_interval": int(stats.get("export_interval", 60)),
+        "metrics_host": stats.get("metrics_host", "127.0.0.1"),
+        "metrics_port": int(stats.get("metrics_port", 0)),
+    }
+
+
+def set_page(name):
+    _page.set(name)
+
+
+def fingerprint(statement):
+    sql = _COMMENTS.sub(" ", statement)
+    sql = _STRINGS.sub("?", sql)
+    sql = _NUMBERS.sub("?", sql)
+    return _SPACES.sub(" ", sql).strip()
+
+
+class QueryStats:
+    def __init__(self, sql):
+        self.sql = sql
+        self.id = hashlib.sha1(sql.encode()).hexdigest()[:12]
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.pages = set()
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, duration_ms, rows, page):
+        self.count += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.rows += max(rows, 0)
+        self.pages.add(page)
+        for i, bound in enumerate(BUCKETS_MS):
+            if duration_ms <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    @property
+    def mean_ms(self):
+        return self.total_ms / self.count if self.count else 0.0
+
+    def percentile(self, q):
+        # Upper bound of the bucket holding the q-th quantile.
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS_MS + [float("inf")], self.buckets):
+            seen += n
+            if seen >= target:
+                return bound
+        return float("inf")
+
+
+def _before(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start"].pop()
+    record(statement, (time.perf_counter() - started) * 1000, cursor.rowcount)
+
+
+def _failed(context):
+    # A failed statement never reaches _after; drop its start so the stack stays in step.
+    conn = context.connection
+    if conn is not None and context.execution_context is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+
+
+def record(statement, duration_ms, rows, page=None):
+    page = page or _page.get()
+    sql = fingerprint(statement)
+    with _lock:
+        stats = _stats.get(sql)
+        if stats is None:
+            stats = _stats[sql] = QueryStats(sql)
+        stats.add(duration_ms, rows, page)
+        _recent.append({
+            "at": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "id": stats.id,
+            "page": page,
+            "ms": round(duration_ms, 2),
+            "rows": rows,
+        })
+
+
+def instrument(engine):
+    global _recent
+    if not event.contains(engine, "before_cursor_execute", _before):
+        event.listen(engine, "before_cursor_execute", _before)
+        event.listen(engine, "after_cursor_execute", _after)
+        event.listen(engine, "handle_error", _failed)
+    ring_size = _settings()["ring_size"]
+    with _lock:
+        if _recent.maxlen != ring_size:
+            _recent = deque(_recent, maxlen=ring_size)
+
+
+def snapshot():
+    with _lock:
+        return list(_stats.values()), list(_recent)
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+        _recent.clear()
+
+
+def top(by="total_ms", n=20):
+    stats, _ = snapshot()
+    return sorted(stats, key=lambda s: getattr(s, by), reverse=True)[:n]
+
+
+def prometheus_text():
+    stats, _ = snapshot()
+    lines = [
+        "# HELP datahall_query_duration_ms Statement duration by fingerprint.",
+        "# TYPE datahall_query_duration_ms histogram",
+    ]
+    for s in stats:
+        cumulative = 0
+        for bound, n in zip([str(b) for b in BUCKETS_MS] + ["+Inf"], s.buckets):
+            cumulative += n
+            lines.append(f'datahall_query_duration_ms_bucket{{query="{s.id}",le="{bound}"}} {cumulative}')
+        lines.append(f'datahall_query_duration_ms_sum{{query="{s.id}"}} {s.total_ms:.3f}')
+        lines.append(f'datahall_query_duration_ms_count{{query="{s.id}"}} {s.count}')
+    lines += ["# HELP datahall_query_rows_total Rows returned or affected by fingerprint.",
+              "# TYPE datahall_query_rows_total counter"]
+    lines += [f'datahall_query_rows_total{{query="{s.id}"}} {s.rows}' for s in stats]
+    return "\n".join(lines) + "\n"
+
+
+def export(path):
+    # One JSON object per fingerprint; the Prometheus text goes next to it.
+    stats, _ = snapshot()
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text("\n".join(json.dumps({
+        "id": s.id, "sql": s.sql, "count": s.count, "total_ms": round(s.total_ms, 3),
+        "mean_ms": round(s.mean_ms, 3), "max_ms": round(s.max_ms, 3), "rows": s.rows,
+        "pages": sorted(s.pages), "buckets": dict(zip([str(b) for b in BUCKETS_MS] + ["+Inf"], s.buckets)),
+    }) for s in stats) + "\n")
+    tmp.replace(path)
+    path.with_suffix(".prom").write_text(prometheus_text())
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _run_exporter(path, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            export(path)
+        except Exception:
+            logger.exception("Query stats export failed")
+
+
+def start_exporters():
+    settings = _settings()
+    with _lock:
+        if settings["export_path"] and "file" not in _workers:
+            _workers["file"] = threading.Thread(
+                target=_run_exporter, args=(settings["export_path"], settings["export_interval"]),
+                name="query-stats-export", daemon=True,
+            )
+            _workers["file"].start()
+        if settings["metrics_port"] and "http" not in _workers:
+            # Tried once per process; a second process on the same port logs the error and goes on.
+            _workers["http"] = None
+            try:
+                server = ThreadingHTTPServer((settings["metrics_host"], settings["metrics_port"]), _MetricsHandler)
+            except OSError:
+                logger.exception("Query stats metrics endpoint not started on %s:%s",
+                                 settings["metrics_host"], settings["metrics_port"])
+                return
+            _workers["http"] = threading.Thread(target=server.serve_forever, name="query-stats-http", daemon=True)
+            _workers["http"].start()
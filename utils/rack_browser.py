@@ -0,0 +1,113 @@
+import json
+
+import pandas as pd
+import streamlit as st
+from sqlalchemy import text
+from utils import reference
+
+PAGE_SIZES = [50, 100, 200]
+
+
+def _like_prefix(value):
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escaped}%"
+
+
+def _where(dh, filters):
+    clauses = ["r.dh = :dh"]
+    params = {"dh": dh}
+
+    if filters.get("name"):
+        clauses.append("r.name ILIKE :name_pattern")
+        params["name_pattern"] = _like_prefix(filters["name"])
+    for column in ("su", "lu", "row"):
+        if filters.get(column):
+            clauses.append(f"r.{column} = ANY(:{column}_values)")
+            params[f"{column}_values"] = list(filters[column])
+    if filters.get("status_ids"):
+        clauses.append("""EXISTS (
+            SELECT 1 FROM rack_state_current rsc
+            WHERE rsc.rack_id = r.id AND rsc.status_id = ANY(:status_ids)
+        )""")
+        params["status_ids"] = list(filters["status_ids"])
+
+    return " AND ".join(clauses), params
+
+
+def page_racks(conn, dh, filters, after, limit):
+    where, params = _where(dh, filters)
+    if after is not None:
+        where += " AND (r.name, r.id) > (:after_name, :after_id)"
+        params.update({"after_name": after[0], "after_id": after[1]})
+
+    return conn.execute(text(f"""
+        SELECT r.id, r.name
+        FROM racks r
+        WHERE {where}
+        ORDER BY r.name, r.id
+        LIMIT :limit
+    """), {**params, "limit": limit}).fetchall()
+
+
+def estimate_count(conn, dh, filters):
+    # Planner estimate instead of COUNT(*): constant cost whatever the hall size.
+    where, params = _where(dh, filters)
+    plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) SELECT 1 FROM racks r WHERE {where}"), params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _distinct_values(conn, dh, column):
+    rows = conn.execute(text(f"""
+        SELECT DISTINCT {column} AS value FROM racks WHERE dh = :dh AND {column} IS NOT NULL ORDER BY 1
+    """), {"dh": dh}).fetchall()
+    return [row.value for row in rows]
+
+
+def render(engine, dh, detail_sql, key, status_filter=False):
+    with engine.connect() as conn:
+        options = {column: _distinct_values(conn, dh, column) for column in ("su", "lu", "row")}
+
+    with st.expander("🔍 Filters"):
+        filters = {"name": st.text_input("Rack name starts with", key=f"{key}_name").strip()}
+        columns = st.columns(4 if status_filter else 3)
+        for col, column in zip(columns, ("su", "lu", "row")):
+            with col:
+                filters[column] = st.multiselect(column.upper(), options[column], key=f"{key}_{column}")
+        if status_filter:
+            statuses = reference.statuses()
+            with columns[3]:
+                selected = st.multiselect("Status", statuses.names, key=f"{key}_status")
+            filters["status_ids"] = [statuses.name_to_id[name] for name in selected]
+
+    page_size = st.selectbox("Racks per page", PAGE_SIZES, key=f"{key}_page_size")
+
+    signature = (dh, page_size, json.dumps(filters, sort_keys=True, default=str))
+    pager = st.session_state.setdefault(f"{key}_pager", {"signature": None, "cursors": [None]})
+    if pager["signature"] != signature:
+        pager.update(signature=signature, cursors=[None])
+
+    with engine.connect() as conn:
+        racks = page_racks(conn, dh, filters, pager["cursors"][-1], page_size + 1)
+        has_next = len(racks) > page_size
+        racks = racks[:page_size]
+        total = estimate_count(conn, dh, filters)
+        rows = conn.execute(text(detail_sql), {"rack_ids": [r.id for r in racks]}).fetchall() if racks else []
+
+    if rows:
+        st.dataframe(pd.DataFrame([dict(row._mapping) for row in rows]), use_container_width=True)
+    else:
+        st.info("No racks found for selected DH.")
+
+    col_prev, col_info, col_next = st.columns([1, 4, 1])
+    with col_prev:
+        if st.button("◀ Previous", key=f"{key}_prev", disabled=len(pager["cursors"]) == 1):
+            pager["cursors"].pop()
+            st.rerun()
+    with col_info:
+        st.caption(f"Page {len(pager['cursors'])} · ~{total} racks")
+    with col_next:
+        if st.button("Next ▶", key=f"{key}_next", disabled=not has_next):
+            pager["cursors"].append((racks[-1].name, racks[-1].id))
+            st.rerun()
@@ -0,0 +1,151 @@
+import csv
+import io
+import time
+
+import pandas as pd
+from sqlalchemy import text
+
+POSITIONS = ["left", "right", "varies", "back", "front"]
+
+COLUMNS = ["rack", "dh", "su", "lu", "row", "activity", "cable_type", "position", "quantity", "measurement"]
+
+COLUMN_ALIASES = {
+    "rack name": "rack",
+    "rack_name": "rack",
+    "name": "rack",
+    "datahall": "dh",
+    "cable type": "cable_type",
+}
+
+STAGING_COLUMNS = [
+    "name", "dh", "su", "lu", "row", "activity_id", "cable_type_id", "position", "quantity", "measurement",
+]
+
+
+def read_upload(uploaded):
+    if uploaded.name.lower().endswith(".xlsx"):
+        return pd.read_excel(uploaded, dtype=str)
+    return pd.read_csv(uploaded, dtype=str)
+
+
+def validate(raw, activities, cable_types):
+    df = raw.rename(columns=lambda c: COLUMN_ALIASES.get(str(c).strip().lower(), str(c).strip().lower()))
+    for column in COLUMNS:
+        if column not in df.columns:
+            df[column] = None
+    df = df[COLUMNS].copy()
+    df.index = df.index + 2  # spreadsheet row numbers, after the header
+
+    for column in COLUMNS:
+        df[column] = df[column].astype("string").str.strip().replace("", pd.NA)
+    df["position"] = df["position"].str.lower()
+
+    activity_ids = {name.lower(): id_ for name, id_ in activities.name_to_id.items()}
+    cable_ids = {name.lower(): id_ for name, id_ in cable_types.name_to_id.items()}
+    df["activity_id"] = df["activity"].str.lower().map(activity_ids)
+    df["cable_type_id"] = df["cable_type"].str.lower().map(cable_ids)
+    quantity = pd.to_numeric(df["quantity"], errors="coerce")
+    df["quantity"] = quantity
+
+    has_result = df[["activity", "cable_type", "position", "quantity"]].notna().any(axis=1)
+    reasons = pd.Series("", index=df.index)
+    checks = [
+        (df["rack"].isna(), "missing rack"),
+        (df["dh"].isna(), "missing dh"),
+        (df["rack"].str.len() > 50, "rack longer than 50"),
+        (df["dh"].str.len() > 15, "dh longer than 15"),
+        (has_result & df["activity_id"].isna(), "unknown activity"),
+        (has_result & df["cable_type_id"].isna(), "unknown cable type"),
+        (has_result & ~df["position"].isin(POSITIONS), "invalid position"),
+        (has_result & (quantity.isna() | (quantity <= 0) | (quantity % 1 != 0)), "quantity must be a positive integer"),
+    ]
+    for mask, reason in checks:
+        mask = mask.fillna(False).astype(bool)
+        reasons[mask] = reasons[mask] + reason + "; "
+
+    rejected = raw.set_axis(df.index).loc[reasons != ""].assign(reason=reasons[reasons != ""].str.rstrip("; "))
+    valid = df[reasons == ""]
+    # The last line wins when a file repeats the same rack result.
+    valid = valid.drop_duplicates(subset=["rack", "dh", "activity_id", "cable_type_id", "position"], keep="last")
+    return valid, rejected
+
+
+def _csv_value(value):
+    if pd.isna(value):
+        return None
+    return int(value) if isinstance(value, float) else value
+
+
+def _copy_to_staging(conn, valid):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    staged = valid[["rack", "dh", "su", "lu", "row", "activity_id", "cable_type_id", "position", "quantity", "measurement"]]
+    for row in staged.itertuples(index=False):
+        writer.writerow([_csv_value(value) for value in row])
+    buffer.seek(0)
+
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY rack_import_staging ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+    finally:
+        cursor.close()
+
+
+def load(conn, valid):
+    started = time.perf_counter()
+
+    conn.execute(text("""
+        CREATE TEMP TABLE rack_import_staging (
+            name TEXT, dh TEXT, su TEXT, lu TEXT, row TEXT,
+            activity_id INTEGER, cable_type_id INTEGER, position TEXT, quantity INTEGER, measurement TEXT
+        ) ON COMMIT DROP
+    """))
+    _copy_to_staging(conn, valid)
+
+    racks = conn.execute(text("""
+        INSERT INTO racks (name, dh, su, lu, row)
+        SELECT name, dh, MAX(su), MAX(lu), MAX(row)
+        FROM rack_import_staging
+        GROUP BY name, dh
+        ON CONFLICT (name, dh) DO UPDATE SET
+            -- Lines that only carry planned quantities leave the rack's location as it is.
+            su = COALESCE(EXCLUDED.su, racks.su),
+            lu = COALESCE(EXCLUDED.lu, racks.lu),
+            row = COALESCE(EXCLUDED.row, racks.row)
+    """)).rowcount
+
+    updated = conn.execute(text("""
+        UPDATE rack_results rr
+        SET quantity = s.quantity, measurement = s.measurement
+        FROM rack_import_staging s
+        JOIN racks r ON r.name = s.name AND r.dh = s.dh
+        WHERE s.activity_id IS NOT NULL
+          AND rr.rack_id = r.id AND rr.activity_id = s.activity_id
+          AND rr.cable_type_id = s.cable_type_id AND rr.position = s.position
+    """)).rowcount
+
+    inserted = conn.execute(text("""
+        INSERT INTO rack_results (rack_id, activity_id, position, cable_type_id, quantity, measurement)
+        SELECT r.id, s.activity_id, s.position, s.cable_type_id, s.quantity, s.measurement
+        FROM rack_import_staging s
+        JOIN racks r ON r.name = s.name AND r.dh = s.dh
+        WHERE s.activity_id IS NOT NULL
+          AND NOT EXISTS (
+              SELECT 1 FROM rack_results rr
+              WHERE rr.rack_id = r.id AND rr.activity_id = s.activity_id
+                AND rr.cable_type_id = s.cable_type_id AND rr.position = s.position
+          )
+    """)).rowcount
+
+    seconds = time.perf_counter() - started
+    return {
+        "rows": len(valid),
+        "racks": racks,
+        "results_inserted": inserted,
+        "results_updated": updated,
+        "seconds": round(seconds, 2),
+        "rows_per_second": round(len(valid) / seconds) if seconds else len(valid),
+    }
@@ -0,0 +1,153 @@
+import argparse
+
+import pandas as pd
+from db import get_engine, int_list, text_list
+from sqlalchemy import text
+
+STATE_KEY = "rack_id, COALESCE(position, ''), COALESCE(activity_id, 0), COALESCE(cable_type_id, 0)"
+
+STATE_COLUMNS = [
+    "rack_id", "activity_id", "cable_type_id", "position", "status_id", "quantity", "percent",
+]
+
+LATEST_STATES_SQL = f"""
+    SELECT DISTINCT ON ({STATE_KEY})
+        id AS rack_state_id, rack_id, position, activity_id, cable_type_id,
+        status_id, quantity, percent, created_by, created_at
+    FROM rack_states
+    ORDER BY {STATE_KEY}, created_at DESC, id DESC
+"""
+
+UPSERT_CURRENT_SQL = f"""
+    INSERT INTO rack_state_current (
+        rack_state_id, rack_id, position, activity_id, cable_type_id,
+        status_id, quantity, percent, created_by, created_at
+    )
+    SELECT DISTINCT ON ({STATE_KEY})
+        id, rack_id, position, activity_id, cable_type_id,
+        status_id, quantity, percent, created_by, created_at
+    FROM inserted
+    ORDER BY {STATE_KEY}, created_at DESC, id DESC
+    ON CONFLICT ({STATE_KEY}) DO UPDATE SET
+        rack_state_id = EXCLUDED.rack_state_id,
+        status_id = EXCLUDED.status_id,
+        quantity = EXCLUDED.quantity,
+        percent = EXCLUDED.percent,
+        created_by = EXCLUDED.created_by,
+        created_at = EXCLUDED.created_at
+    WHERE rack_state_current.created_at <= EXCLUDED.created_at
+"""
+
+
+def insert_states(conn, states, created_by, created_at):
+    # Appends to rack_states and keeps rack_state_current in step, in one statement.
+    if states.empty:
+        return
+
+    conn.execute(text(f"""
+        WITH inserted AS (
+            INSERT INTO rack_states (
+                rack_id, activity_id, cable_type_id, position, status_id,
+                quantity, percent, created_by, created_at
+            )
+            SELECT v.rack_id, v.activity_id, v.cable_type_id, v.position, v.status_id,
+                   v.quantity, v.percent, :created_by, :created_at
+            FROM unnest(
+                CAST(:rack_ids AS integer[]),
+                CAST(:activity_ids AS integer[]),
+                CAST(:cable_type_ids AS integer[]),
+                CAST(:positions AS text[]),
+                CAST(:status_ids AS integer[]),
+                CAST(:quantities AS integer[]),
+                CAST(:percents AS numeric[])
+            ) AS v(rack_id, activity_id, cable_type_id, position, status_id, quantity, percent)
+            RETURNING *
+        )
+        {UPSERT_CURRENT_SQL}
+    """), {
+        "rack_ids": int_list(states["rack_id"]),
+        "activity_ids": int_list(states["activity_id"]),
+        "cable_type_ids": int_list(states["cable_type_id"]),
+        "positions": text_list(states["position"]),
+        "status_ids": int_list(states["status_id"]),
+        "quantities": int_list(states["quantity"]),
+        "percents": [None if pd.isna(v) else float(v) for v in states["percent"]],
+        "created_by": created_by,
+        "created_at": created_at,
+    })
+
+
+def backfill(conn):
+    conn.execute(text("TRUNCATE rack_state_current"))
+    result = conn.execute(text(f"""
+        INSERT INTO rack_state_current (
+            rack_state_id, rack_id, position, activity_id, cable_type_id,
+            status_id, quantity, percent, created_by, created_at
+        )
+        SELECT rack_state_id, rack_id, position, activity_id, cable_type_id,
+               status_id, quantity, percent, created_by, created_at
+        FROM ({LATEST_STATES_SQL}) latest
+    """))
+    return result.rowcount
+
+
+def check(conn, limit=20):
+    rows = conn.execute(text("""
+        WITH expected AS (
+            SELECT *
+            FROM (
+                SELECT *,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY rack_id, position, activity_id, cable_type_id
+                           ORDER BY created_at DESC, id DESC
+                       ) AS rn
+                FROM rack_states
+            ) ranked
+            WHERE rn = 1
+        )
+        SELECT COALESCE(e.rack_id, c.rack_id) AS rack_id,
+               COALESCE(e.position, c.position) AS position,
+               COALESCE(e.activity_id, c.activity_id) AS activity_id,
+               COALESCE(e.cable_type_id, c.cable_type_id) AS cable_type_id,
+               e.id AS expected_state_id,
+               c.rack_state_id AS current_state_id
+        FROM expected e
+        FULL OUTER JOIN rack_state_current c
+          ON c.rack_id = e.rack_id
+         AND c.position IS NOT DISTINCT FROM e.position
+         AND c.activity_id IS NOT DISTINCT FROM e.activity_id
+         AND c.cable_type_id IS NOT DISTINCT FROM e.cable_type_id
+        WHERE e.id IS DISTINCT FROM c.rack_state_id
+          -- States whose history month was archived (utils.partitions) are only in the projection.
+          AND (e.id IS NOT NULL OR c.created_at >= (SELECT MIN(created_at) FROM rack_states))
+          AND (e.created_at IS DISTINCT FROM c.created_at
+               OR e.status_id IS DISTINCT FROM c.status_id
+               OR e.quantity IS DISTINCT FROM c.quantity
+               OR e.percent IS DISTINCT FROM c.percent)
+        LIMIT :limit
+    """), {"limit": limit}).fetchall()
+    return [dict(row._mapping) for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the rack_state_current table.")
+    parser.add_argument("command", choices=["backfill", "check"])
+    args = parser.parse_args()
+
+    engine = get_engine()
+    if args.command == "backfill":
+        with engine.begin() as conn:
+            count = backfill(conn)
+        print(f"rack_state_current rebuilt: {count} rows")
+    else:
+        with engine.connect() as conn:
+            mismatches = check(conn)
+        if mismatches:
+            for row in mismatches:
+                print(row)
+            raise SystemExit(f"{len(mismatches)} mismatching rack states (showing at most 20)")
+        print("rack_state_current is consistent with rack_states")
+
+
+if __name__ == "__main__":
+    main()
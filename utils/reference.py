@@ -0,0 +1,160 @@
+import logging
+import threading
+import time
+from collections import namedtuple
+
+import select
+from db import get_engine
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+CACHE_TTL = 300
+NOTIFY_CHANNEL = "reference_data"
+
+TABLES = {
+    "locations": "SELECT id, name FROM locations ORDER BY name NULLS FIRST",
+    "activities": "SELECT id, name FROM activities ORDER BY name NULLS FIRST",
+    "cable_type": "SELECT id, name FROM cable_type ORDER BY name NULLS FIRST",
+    "statuses": "SELECT id, name FROM statuses ORDER BY name",
+    "racks": "SELECT id, name, dh FROM racks ORDER BY name NULLS FIRST",
+    "technicians": "SELECT id, name FROM technicians ORDER BY name",
+    "team_leads": "SELECT id, name FROM technicians WHERE is_teamlead = true ORDER BY name",
+}
+
+# Tables without a lookup here whose changes are still broadcast, for the caches
+# that subscribe() to them (planned quantities, project time zones).
+SUBSCRIBED_TABLES = ("rack_results", "projects")
+
+LABELS = {
+    "racks": lambda row: f"{row.name} ({row.dh})",
+}
+
+Lookup = namedtuple("Lookup", ["rows", "id_to_name", "name_to_id", "names"])
+
+_cache = {}
+_versions = {table: 0 for table in TABLES}
+_lock = threading.Lock()
+_listener = None
+_subscribers = []
+
+
+def _load(table):
+    with get_engine().connect() as conn:
+        rows = conn.execute(text(TABLES[table])).fetchall()
+
+    label = LABELS.get(table, lambda row: row.name)
+    names = [label(row) for row in rows]
+    return Lookup(
+        rows=rows,
+        id_to_name={row.id: name for row, name in zip(rows, names)},
+        name_to_id={name: row.id for row, name in zip(rows, names)},
+        names=names,
+    )
+
+
+def get(table):
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(table)
+        version = _versions[table]
+    if entry and entry[1] == version and now - entry[2] < CACHE_TTL:
+        return entry[0]
+
+    lookup = _load(table)
+    with _lock:
+        # Skip storing if an invalidation arrived while we were loading.
+        if _versions[table] == version:
+            _cache[table] = (lookup, version, now)
+    return lookup
+
+
+def locations():
+    return get("locations")
+
+
+def activities():
+    return get("activities")
+
+
+def cable_types():
+    return get("cable_type")
+
+
+def statuses():
+    return get("statuses")
+
+
+def racks():
+    return get("racks")
+
+
+def technicians():
+    return get("technicians")
+
+
+def team_leads():
+    return get("team_leads")
+
+
+def subscribe(callback):
+    # callback(tables) runs after local or notified invalidations, e.g. to drop a derived cache.
+    with _lock:
+        _subscribers.append(callback)
+
+
+def _bump(tables):
+    with _lock:
+        for table in tables:
+            if table in _versions:
+                _versions[table] += 1
+                _cache.pop(table, None)
+        subscribers = list(_subscribers)
+    for callback in subscribers:
+        callback(set(tables))
+
+
+def invalidate(*tables, conn=None):
+    tables = tables or tuple(TABLES) + SUBSCRIBED_TABLES
+    _bump(tables)
+
+    # Tell the other app processes; a listener there bumps its own versions.
+    payload = ",".join(tables)
+    if conn is not None:
+        conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": NOTIFY_CHANNEL, "payload": payload})
+    else:
+        with get_engine().begin() as own_conn:
+            own_conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": NOTIFY_CHANNEL, "payload": payload})
+
+
+def _listen():
+    while True:
+        try:
+            raw = get_engine().raw_connection()
+            try:
+                dbapi_conn = raw.dbapi_connection
+                dbapi_conn.autocommit = True
+                cursor = dbapi_conn.cursor()
+                cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                # Anything could have changed while we were not listening.
+                _bump(tuple(TABLES) + SUBSCRIBED_TABLES)
+                while True:
+                    if select.select([dbapi_conn], [], [], 60) == ([], [], []):
+                        continue
+                    dbapi_conn.poll()
+                    while dbapi_conn.notifies:
+                        notify = dbapi_conn.notifies.pop(0)
+                        _bump(notify.payload.split(",") if notify.payload else tuple(TABLES) + SUBSCRIBED_TABLES)
+            finally:
+                raw.invalidate()
+        except Exception:
+            logger.exception("Reference data listener failed; reconnecting in 5 s")
+            time.sleep(5)
+
+
+def start_listener():
+    global _listener
+    with _lock:
+        if _listener is None:
+            _listener = threading.Thread(target=_listen, name="reference-data-listener", daemon=True)
+            _listener.start()
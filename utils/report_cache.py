@@ -0,0 +1,116 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import streamlit as st
+from db import get_engine
+from sqlalchemy import text
+from utils import dates, pdf_report
+
+DEFAULT_PROJECT = "default"
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_worker = None
+
+
+def _settings():
+    reports = st.secrets.get("reports", {})
+    return {
+        "cache_dir": Path(reports.get("cache_dir", Path(__file__).resolve().parent.parent / ".report_cache")),
+        "max_bytes": int(reports.get("cache_max_mb", 200)) * 1024 * 1024,
+        "interval": int(reports.get("prerender_interval", 300)),
+    }
+
+
+def data_version(conn, start, end):
+    row = conn.execute(text("""
+        SELECT COUNT(*) AS n, MAX(id) AS last_id, MAX(created_at) AS last_at
+        FROM rack_states
+        WHERE created_at >= :start AND created_at < :end
+    """), {"start": start, "end": end}).first()
+    return hashlib.sha1(f"{row.n}:{row.last_id}:{row.last_at}".encode()).hexdigest()[:16]
+
+
+def _safe(value):
+    return "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in str(value))
+
+
+def _path(cache_dir, day, project, version):
+    return cache_dir / f"{day:%Y-%m-%d}__{_safe(project)}__{version}.pdf"
+
+
+def _evict(cache_dir, max_bytes):
+    files = sorted(cache_dir.glob("*.pdf"), key=lambda p: p.stat().st_mtime)
+    total = sum(p.stat().st_size for p in files)
+    for path in files:
+        if total <= max_bytes:
+            break
+        total -= path.stat().st_size
+        path.unlink(missing_ok=True)
+
+
+def get_or_render(conn, day, project, tz):
+    settings = _settings()
+    cache_dir = settings["cache_dir"]
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    start, end = dates.day_bounds(day, tz)
+    project = project or DEFAULT_PROJECT
+    path = _path(cache_dir, day, project, data_version(conn, start, end))
+
+    if path.exists():
+        os.utime(path)
+        return path.read_bytes()
+
+    pdf = pdf_report.daily_report(conn, start, end, day)
+
+    tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(pdf)
+    os.replace(tmp, path)
+
+    # Older versions of the same report are stale now.
+    for old in cache_dir.glob(f"{day:%Y-%m-%d}__{_safe(project)}__*.pdf"):
+        if old != path:
+            old.unlink(missing_ok=True)
+    _evict(cache_dir, settings["max_bytes"])
+    return pdf
+
+
+def _projects(conn):
+    rows = conn.execute(text("SELECT project, time_zone FROM projects")).fetchall()
+    projects = [(row.project, dates.zone(row.time_zone)) for row in rows if row.time_zone]
+    return projects or [(DEFAULT_PROJECT, ZoneInfo(dates.DEFAULT_TIMEZONE))]
+
+
+def prerender():
+    with get_engine().connect() as conn:
+        for project, tz in _projects(conn):
+            today = dates.today(tz)
+            for day in (today - timedelta(days=1), today):
+                get_or_render(conn, day, project, tz)
+
+
+def _run_worker(interval):
+    while True:
+        try:
+            prerender()
+        except Exception:
+            logger.exception("Report pre-render failed")
+        time.sleep(interval)
+
+
+def start_worker():
+    global _worker
+    with _lock:
+        if _worker is None:
+            _worker = threading.Thread(
+                target=_run_worker, args=(_settings()["interval"],), name="report-prerender", daemon=True
+            )
+            _worker.start()
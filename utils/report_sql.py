@@ -0,0 +1,80 @@
+# Technician names per rack / activity / cable type are aggregated once in a
+# CTE and joined in, instead of a correlated subquery per output row.
+# Runs for one page of racks of the rack browser.
+DATAHALL_REPORT_SQL = """
+    WITH dh_racks AS (
+        SELECT id, name, dh, su, lu, row
+        FROM racks
+        WHERE id = ANY(:rack_ids)
+    ),
+    rack_technicians AS (
+        SELECT tt.rack_id, tt.activity_id, tt.cable_type_id,
+               STRING_AGG(DISTINCT tech.name, ', ') AS technicians
+        FROM technician_tasks tt
+        JOIN dh_racks r ON r.id = tt.rack_id
+        JOIN technicians tech ON tech.id = tt.technician_id
+        GROUP BY tt.rack_id, tt.activity_id, tt.cable_type_id
+    )
+    SELECT
+        r.name AS rack_name,
+        r.dh,
+        r.su,
+        r.lu,
+        r.row,
+        rs.position,
+        a.name AS activity,
+        ct.name AS cable_type,
+        s.name AS status,
+        rs.quantity,
+        rs.percent,
+        t.name AS created_by,
+        rs.created_at,
+        rt.technicians
+    FROM dh_racks r
+    LEFT JOIN rack_state_current rs ON rs.rack_id = r.id
+    LEFT JOIN rack_technicians rt
+        ON rt.rack_id = r.id
+       AND rt.activity_id = rs.activity_id
+       AND rt.cable_type_id = rs.cable_type_id
+    LEFT JOIN activities a ON rs.activity_id = a.id
+    LEFT JOIN cable_type ct ON rs.cable_type_id = ct.id
+    LEFT JOIN statuses s ON rs.status_id = s.id
+    LEFT JOIN technicians t ON rs.created_by = t.id
+    ORDER BY r.name, r.id, rs.created_at DESC NULLS LAST
+"""
+
+DAILY_RACK_REPORT_SQL = """
+    WITH day_technicians AS (
+        SELECT tt.rack_id, tt.activity_id, tt.cable_type_id,
+               STRING_AGG(DISTINCT tech.name, ', ') AS technicians
+        FROM technician_tasks tt
+        JOIN technicians tech ON tech.id = tt.technician_id
+        WHERE tt.timestamp >= :start_datetime AND tt.timestamp < :end_datetime
+        GROUP BY tt.rack_id, tt.activity_id, tt.cable_type_id
+    )
+    SELECT DISTINCT ON (rs.rack_id, rs.activity_id, rs.cable_type_id, rs.position, rs.status_id)
+        r.name AS rack_name,
+        r.dh,
+        r.su,
+        rs.position,
+        a.name AS activity,
+        ct.name AS cable_type,
+        s.name AS status,
+        rs.quantity,
+        rs.percent,
+        dt.technicians,
+        u.name AS created_by,
+        rs.created_at AS created_at
+    FROM rack_states rs
+    JOIN racks r ON r.id = rs.rack_id
+    LEFT JOIN day_technicians dt
+        ON dt.rack_id = rs.rack_id
+       AND dt.activity_id = rs.activity_id
+       AND dt.cable_type_id = rs.cable_type_id
+    LEFT JOIN activities a ON a.id = rs.activity_id
+    LEFT JOIN cable_type ct ON ct.id = rs.cable_type_id
+    LEFT JOIN statuses s ON s.id = rs.status_id
+    LEFT JOIN technicians u ON u.id = rs.created_by
+    WHERE rs.created_at >= :start_datetime AND rs.created_at < :end_datetime {filters}
+    ORDER BY rs.rack_id, rs.activity_id, rs.cable_type_id, rs.position, rs.status_id, rs.created_at DESC
+"""
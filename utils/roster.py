@@ -0,0 +1,75 @@
+import time
+
+import pandas as pd
+from utils import table_sync
+
+EMAIL_REGEX = r"^[\w\.-]+@[\w\.-]+\.\w+$"
+
+NO_TEAM_LEAD = "—"
+
+TYPES = {
+    "id": "integer",
+    "name": "text",
+    "email": "text",
+    "team_lead": "integer",
+    "project": "text",
+    "is_teamlead": "boolean",
+    "activ": "boolean",
+    "admin": "boolean",
+}
+
+COLUMNS = [c for c in TYPES if c != "id"]
+
+TASK_TABLES = ("technician_tasks", "technician_current_task")
+
+
+def prepare(edited, team_leads):
+    # team_leads maps team lead id -> name, as shown in the editor.
+    # Returns the rows to keep, the ids to delete and a list of row errors.
+    df = edited.copy()
+    df["row"] = range(1, len(df) + 1)
+    df["name"] = df["name"].astype("string").str.strip().fillna("")
+    df["email"] = df["email"].astype("string").str.strip().str.lower().fillna("")
+    df["project"] = df["project"].astype("string").str.strip().replace({"": pd.NA, "None": pd.NA})
+    for column in ("is_teamlead", "activ", "admin", "del"):
+        df[column] = df[column].fillna(False).astype(bool)
+
+    lead_ids = {name: id_ for id_, name in team_leads.items()}
+    df["team_lead"] = df["team_lead_name"].astype("string").str.strip().map(lead_ids)
+
+    is_new = df["id"].isna()
+    delete = df["del"] & ~is_new
+    df = df[~df["del"] & ~(is_new & (df["name"] == "") & (df["email"] == ""))]
+
+    missing = (df["name"] == "") | (df["email"] == "")
+    bad_email = ~missing & ~df["email"].str.match(EMAIL_REGEX).fillna(False).astype(bool)
+    repeated = ~missing & df["email"].duplicated()
+
+    errors = [(row, "name and email") for row in df.loc[missing, "row"]]
+    errors += [(row, f"wrong email: '{email}'") for row, email in df.loc[bad_email, ["row", "email"]].itertuples(index=False)]
+    errors += [(row, f"email '{email}' already exist.") for row, email in df.loc[repeated, ["row", "email"]].itertuples(index=False)]
+
+    deleted_ids = edited.loc[delete[delete].index, "id"].astype(int).tolist()
+    return df[["id"] + COLUMNS], deleted_ids, [f"Row {row}: {message}" for row, message in sorted(errors)]
+
+
+def save(conn, original, edited, team_leads):
+    started = time.perf_counter()
+    rows, deleted_ids, errors = prepare(edited, team_leads)
+    validated = time.perf_counter()
+    if errors:
+        return {"errors": errors, "validate_ms": round((validated - started) * 1000, 1)}
+
+    # Only rows ticked "del" are deleted; a row dropped from the editor is left alone.
+    changes = table_sync.diff(original, rows, "id", COLUMNS)._replace(deleted=deleted_ids)
+    summary = table_sync.apply(
+        conn, "technicians", changes, "id", TYPES,
+        dependents=[(table, "technician_id") for table in TASK_TABLES],
+    )
+
+    summary.update({
+        "errors": [],
+        "validate_ms": round((validated - started) * 1000, 1),
+        "write_ms": round((time.perf_counter() - validated) * 1000, 1),
+    })
+    return summary
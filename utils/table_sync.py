@@ -0,0 +1,80 @@
+from collections import namedtuple
+
+import pandas as pd
+from db import LISTS, unnest_params, unnest_sql
+from sqlalchemy import text
+
+Changes = namedtuple("Changes", ["inserted", "updated", "deleted"])
+
+
+def _comparable(df, columns):
+    return df[columns].astype(object).where(df[columns].notna(), None)
+
+
+def diff(original, edited, key, columns):
+    # Rows are matched on the key column, never on their position in the editor.
+    # Edited rows without a key are new; original keys missing from the edit are deleted.
+    new = edited[edited[key].isna()]
+    kept = edited[edited[key].notna()]
+
+    kept_keys = set(kept[key])
+    deleted = [k for k in original[key] if k not in kept_keys]
+
+    before = _comparable(original.set_index(key), columns)
+    after = _comparable(kept.set_index(key), columns)
+    inserted_keys = after.index.difference(before.index)
+    after_existing = after.loc[after.index.intersection(before.index)]
+    previous = before.loc[after_existing.index]
+    same = (after_existing == previous) | (after_existing.isna() & previous.isna())
+    changed = ~same.all(axis=1)
+
+    updated = after_existing[changed].reset_index()
+    # A key typed into the editor that did not exist before is an insert too.
+    inserted = pd.concat([new[[key] + columns], after.loc[inserted_keys].reset_index()], ignore_index=True)
+    return Changes(inserted, updated, deleted)
+
+
+def duplicates(df, column):
+    values = df[column].dropna().astype(str).str.strip().str.lower()
+    return sorted(df.loc[values[values.duplicated()].index, column].unique())
+
+
+def _types(types, columns):
+    return {column: types[column] for column in columns}
+
+
+def apply(conn, table, changes, key, types, generated_key=True, dependents=()):
+    # types maps every synced column, key included, to its SQL type.
+    # dependents are (table, column) pairs whose rows go away with a deleted key.
+    columns = [c for c in types if c != key]
+    key_type = types[key]
+
+    if changes.deleted:
+        keys = LISTS[key_type](changes.deleted)
+        for dep_table, dep_column in dependents:
+            conn.execute(text(f"DELETE FROM {dep_table} WHERE {dep_column} = ANY(CAST(:keys AS {key_type}[]))"),
+                         {"keys": keys})
+        conn.execute(text(f"DELETE FROM {table} WHERE {key} = ANY(CAST(:keys AS {key_type}[]))"), {"keys": keys})
+
+    if not changes.updated.empty:
+        assignments = ", ".join(f"{column} = v.{column}" for column in columns)
+        conn.execute(text(f"""
+            UPDATE {table} t
+            SET {assignments}
+            FROM {unnest_sql(types)}
+            WHERE t.{key} = v.{key}
+        """), unnest_params(changes.updated, types))
+
+    if not changes.inserted.empty:
+        insert_types = _types(types, columns if generated_key else [key] + columns)
+        conn.execute(text(f"""
+            INSERT INTO {table} ({', '.join(insert_types)})
+            SELECT {', '.join(f'v.{column}' for column in insert_types)}
+            FROM {unnest_sql(insert_types)}
+        """), unnest_params(changes.inserted, insert_types))
+
+    return {
+        "inserted": len(changes.inserted),
+        "updated": len(changes.updated),
+        "deleted": len(changes.deleted),
+    }
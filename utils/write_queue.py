@@ -0,0 +1,240 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import streamlit as st
+from db import get_engine
+from sqlalchemy import exc
+from utils import current_task
+
+# Write-behind queue for technician task inserts. Submissions are spooled to a
+# local SQLite (WAL) file and acknowledged at once; a background thread moves
+# them to PostgreSQL through current_task.insert_tasks() in multi-row batches.
+# All app processes on a host share the spool: a flush first claims its rows
+# with one UPDATE ... RETURNING, so no two processes insert the same row.
+
+COLUMNS = ["technician_id", "location_id", "activity_id", "cable_type_id", "rack_id", "source", "position"]
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_flushed = threading.Condition()
+_wake = threading.Event()
+_spool = None
+_worker = None
+
+
+def _settings():
+    queue = st.secrets.get("write_queue", {})
+    return {
+        "spool_path": Path(queue.get("spool_path", Path(__file__).resolve().parent.parent / ".write_queue.sqlite3")),
+        "flush_ms": int(queue.get("flush_ms", 200)),
+        "batch_rows": int(queue.get("batch_rows", 500)),
+        "retry_seconds": int(queue.get("retry_seconds", 5)),
+        # Rows claimed by a process that died are taken over after this long.
+        "claim_seconds": int(queue.get("claim_seconds", 300)),
+    }
+
+
+def _owner():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _open_spool():
+    global _spool
+    if _spool is None:
+        path = _settings()["spool_path"]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _spool = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        _spool.execute("PRAGMA journal_mode=WAL")
+        _spool.execute("PRAGMA synchronous=NORMAL")
+        _spool.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL, owner TEXT, claimed_at REAL
+            )
+        """)
+        columns = {row[1] for row in _spool.execute("PRAGMA table_info(tasks)")}
+        if "owner" not in columns:
+            # Spools written before claims were added.
+            _spool.execute("ALTER TABLE tasks ADD COLUMN owner TEXT")
+            _spool.execute("ALTER TABLE tasks ADD COLUMN claimed_at REAL")
+        _spool.execute("""
+            CREATE TABLE IF NOT EXISTS failed (
+                id INTEGER PRIMARY KEY, payload TEXT NOT NULL, error TEXT, failed_at TEXT
+            )
+        """)
+    return _spool
+
+
+class Ack:
+    # Returned by submit(): the rows are spooled locally under ids first_id..last_id.
+    def __init__(self, first_id, last_id, rows):
+        self.first_id = first_id
+        self.last_id = last_id
+        self.rows = rows
+
+    def done(self):
+        if not self.rows:
+            return True
+        with _lock:
+            return _open_spool().execute(
+                "SELECT NOT EXISTS (SELECT 1 FROM tasks WHERE id BETWEEN ? AND ?)", (self.first_id, self.last_id)
+            ).fetchone()[0] == 1
+
+    def wait(self, timeout=None):
+        # True once the rows are committed to PostgreSQL (or quarantined).
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with _flushed:
+            while not self.done():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                # Another app process may flush these rows, so poll as well as wait for ours.
+                _flushed.wait(0.1 if remaining is None else min(remaining, 0.1))
+        return True
+
+
+def _payload(row, timestamp):
+    payload = {column: (None if pd.isna(row.get(column)) else row.get(column)) for column in COLUMNS}
+    for column in COLUMNS:
+        if payload[column] is not None and column != "position":
+            payload[column] = int(payload[column])
+    payload["timestamp"] = timestamp.isoformat()
+    return json.dumps(payload)
+
+
+def submit(tasks, timestamp):
+    # Same frame as current_task.insert_tasks(); returns an Ack right after the local write.
+    payloads = [(_payload(row, timestamp),) for row in tasks.to_dict("records")]
+    if not payloads:
+        return Ack(0, 0, 0)
+
+    with _lock:
+        spool = _open_spool()
+        spool.execute("BEGIN IMMEDIATE")
+        spool.executemany("INSERT INTO tasks (payload) VALUES (?)", payloads)
+        last_id = spool.execute("SELECT MAX(id) FROM tasks").fetchone()[0]
+        spool.execute("COMMIT")
+        waiting = spool.execute("SELECT COUNT(*) FROM tasks WHERE owner IS NULL").fetchone()[0]
+
+    if waiting >= _settings()["batch_rows"]:
+        _wake.set()
+    # One write transaction at a time, so the ids are consecutive.
+    return Ack(last_id - len(payloads) + 1, last_id, len(payloads))
+
+
+def pending():
+    with _lock:
+        return _open_spool().execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+
+def failed_count():
+    with _lock:
+        return _open_spool().execute("SELECT COUNT(*) FROM failed").fetchone()[0]
+
+
+def failed(limit=100):
+    with _lock:
+        rows = _open_spool().execute(
+            "SELECT id, payload, error, failed_at FROM failed ORDER BY id DESC LIMIT ?", (limit,)
+        ).fetchall()
+    return pd.DataFrame(rows, columns=["id", "payload", "error", "failed_at"])
+
+
+def _frame(batch):
+    tasks = pd.DataFrame([json.loads(payload) for _, payload in batch])
+    tasks["timestamp"] = [datetime.fromisoformat(ts) for ts in tasks["timestamp"]]
+    return tasks
+
+
+def _claim(limit, claim_seconds):
+    # Takes unclaimed rows, rows this process claimed before (a failed flush), and
+    # rows whose claim expired, in one statement.
+    owner = _owner()
+    now = time.time()
+    with _lock:
+        batch = _open_spool().execute("""
+            UPDATE tasks SET owner = ?, claimed_at = ?
+            WHERE id IN (
+                SELECT id FROM tasks
+                WHERE owner IS NULL OR owner = ? OR claimed_at < ?
+                ORDER BY id
+                LIMIT ?
+            )
+            RETURNING id, payload
+        """, (owner, now, owner, now - claim_seconds, limit)).fetchall()
+    return sorted(batch)
+
+
+def _mark_flushed(ids):
+    with _lock:
+        _spool.execute(
+            f"DELETE FROM tasks WHERE owner = ? AND id IN ({', '.join('?' * len(ids))})", [_owner(), *ids]
+        )
+    with _flushed:
+        _flushed.notify_all()
+
+
+def _quarantine(batch, error):
+    # Rows the database rejects on their own are set aside so they cannot block the queue.
+    with _lock:
+        _spool.executemany(
+            "INSERT OR REPLACE INTO failed (id, payload, error, failed_at) VALUES (?, ?, ?, ?)",
+            [(id_, payload, str(error), datetime.now().isoformat()) for id_, payload in batch],
+        )
+    _mark_flushed([id_ for id_, _ in batch])
+
+
+def flush(limit=None):
+    # Writes up to limit spooled rows in one transaction; returns how many were written.
+    settings = _settings()
+    with _flush_lock:
+        batch = _claim(limit or settings["batch_rows"], settings["claim_seconds"])
+        if not batch:
+            return 0
+
+        try:
+            with get_engine().begin() as conn:
+                current_task.insert_tasks(conn, _frame(batch))
+        except (exc.IntegrityError, exc.DataError):
+            for row in batch:
+                try:
+                    with get_engine().begin() as conn:
+                        current_task.insert_tasks(conn, _frame([row]))
+                    _mark_flushed([row[0]])
+                except (exc.IntegrityError, exc.DataError) as e:
+                    _quarantine([row], e)
+            return len(batch)
+
+        _mark_flushed([id_ for id_, _ in batch])
+        return len(batch)
+
+
+def _run_worker(settings):
+    while True:
+        _wake.wait(settings["flush_ms"] / 1000)
+        _wake.clear()
+        try:
+            while flush(settings["batch_rows"]) == settings["batch_rows"]:
+                pass
+        except Exception:
+            # Database slow or down: the rows stay claimed in the spool until the next attempt.
+            logger.exception("Task write queue flush failed")
+            time.sleep(settings["retry_seconds"])
+
+
+def start_worker():
+    global _worker
+    with _lock:
+        if _worker is None:
+            _open_spool()
+            _worker = threading.Thread(target=_run_worker, args=(_settings(),), name="task-write-queue", daemon=True)
+            _worker.start()